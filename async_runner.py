@@ -0,0 +1,200 @@
+import asyncio
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from docker.utils import parse_bytes
+
+from runner import LogCapture
+
+# Docker multiplexed stream header: stream type (1 byte), 3 padding bytes,
+# payload size (big-endian uint32).
+_FRAME_HEADER = struct.Struct(">BxxxL")
+_CHANNELS = {1: "stdout", 2: "stderr"}
+
+
+def _docker_socket() -> str:
+    host = os.getenv("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return urlparse(host).path
+    return "/var/run/docker.sock"
+
+
+class AsyncCodexRunner:
+    """asyncio counterpart of CodexRunner speaking the Engine API directly.
+
+    All jobs share one httpx connection pool over the Docker unix socket, and
+    a semaphore caps how many containers run at once, so a single process can
+    fan out hundreds of jobs without a thread per job. Resource limits and
+    security options match CodexRunner.
+    """
+
+    def __init__(
+        self,
+        image: str = "local/codex-cli:latest",
+        workdir: str = "/workspace",
+        default_env: Optional[Dict[str, str]] = None,
+        remove: bool = True,
+        network_mode: Optional[str] = None,
+        mem_limit: str = "2g",
+        nano_cpus: int = 2_000_000_000,  # 2 vCPU
+        pids_limit: int = 512,
+        user: str = "node",
+        labels: Optional[Dict[str, str]] = None,
+        max_concurrency: int = 64,
+        socket_path: Optional[str] = None,
+        api_version: str = "v1.41",
+    ) -> None:
+        self.image = image
+        self.workdir = workdir
+        self.default_env = default_env or {}
+        self.remove = remove
+        self.network_mode = network_mode
+        self.mem_limit = mem_limit
+        self.nano_cpus = nano_cpus
+        self.pids_limit = pids_limit
+        self.user = user
+        self.labels = labels or {"app": "codex-cli"}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Each running job holds one connection for /wait and one for /logs.
+        transport = httpx.AsyncHTTPTransport(
+            uds=socket_path or _docker_socket(),
+            limits=httpx.Limits(max_connections=max_concurrency * 2 + 8),
+        )
+        self.http = httpx.AsyncClient(
+            transport=transport,
+            base_url=f"http://docker/{api_version}",
+            timeout=httpx.Timeout(30.0, read=None),
+        )
+
+    async def __aenter__(self) -> "AsyncCodexRunner":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+    def _create_body(
+        self,
+        args: List[str],
+        host_job_dir: Optional[str],
+        env: Dict[str, str],
+        entrypoint: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        binds = []
+        if host_job_dir:
+            binds.append(f"{os.path.abspath(host_job_dir)}:{self.workdir}/job:rw")
+        host_config: Dict[str, Any] = {
+            "Binds": binds,
+            "Memory": parse_bytes(self.mem_limit),
+            "NanoCpus": self.nano_cpus,
+            "PidsLimit": self.pids_limit,
+            "SecurityOpt": ["no-new-privileges:true"],
+            "ReadonlyRootfs": False,
+        }
+        if self.network_mode:
+            host_config["NetworkMode"] = self.network_mode
+        body: Dict[str, Any] = {
+            "Image": self.image,
+            "Cmd": args,
+            "WorkingDir": self.workdir,
+            "User": self.user,
+            "Env": [f"{k}={v}" for k, v in env.items()],
+            "Labels": self.labels,
+            "Tty": False,
+            "OpenStdin": False,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "HostConfig": host_config,
+        }
+        if entrypoint is not None:
+            body["Entrypoint"] = entrypoint
+        return body
+
+    async def _create(self, body: Dict[str, Any], name: Optional[str]) -> str:
+        params = {"name": name} if name else None
+        resp = await self.http.post("/containers/create", params=params, json=body)
+        if resp.status_code == 404:
+            # Image missing locally; pull it, then retry once.
+            pull = await self.http.post(
+                "/images/create", params={"fromImage": self.image}, timeout=None
+            )
+            pull.raise_for_status()
+            resp = await self.http.post("/containers/create", params=params, json=body)
+        resp.raise_for_status()
+        return resp.json()["Id"]
+
+    async def _pump_logs(self, cid: str, capture: LogCapture) -> None:
+        params = {"follow": 1, "stdout": 1, "stderr": 1}
+        async with self.http.stream("GET", f"/containers/{cid}/logs", params=params) as resp:
+            resp.raise_for_status()
+            buf = b""
+            async for chunk in resp.aiter_bytes():
+                buf += chunk
+                while len(buf) >= _FRAME_HEADER.size:
+                    kind, size = _FRAME_HEADER.unpack_from(buf)
+                    end = _FRAME_HEADER.size + size
+                    if len(buf) < end:
+                        break
+                    capture.feed(_CHANNELS.get(kind, "stdout"), buf[_FRAME_HEADER.size:end])
+                    buf = buf[end:]
+
+    async def run(
+        self,
+        args: List[str],
+        host_job_dir: Optional[str] = None,
+        extra_env: Optional[Dict[str, str]] = None,
+        timeout_sec: int = 300,
+        entrypoint: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        capture: Optional[LogCapture] = None,
+    ) -> Tuple[int, str]:
+        """Async equivalent of CodexRunner.run. Returns (exit_code, logs)."""
+        env = {**self.default_env, **(extra_env or {})}
+        if capture is None:
+            capture = LogCapture()
+        body = self._create_body(args, host_job_dir, env, entrypoint)
+
+        async with self.semaphore:
+            cid = None
+            logs_task = None
+            try:
+                cid = await self._create(body, name)
+                resp = await self.http.post(f"/containers/{cid}/start")
+                resp.raise_for_status()
+                logs_task = asyncio.create_task(self._pump_logs(cid, capture))
+
+                try:
+                    resp = await asyncio.wait_for(
+                        self.http.post(f"/containers/{cid}/wait"), timeout_sec
+                    )
+                except asyncio.TimeoutError:
+                    try:
+                        await self.http.post(f"/containers/{cid}/kill")
+                    except httpx.HTTPError:
+                        pass
+                    raise TimeoutError(f"codex job timed out after {timeout_sec}s")
+                resp.raise_for_status()
+                code = resp.json().get("StatusCode", 1)
+
+                # The follow stream ends once the container has exited.
+                try:
+                    await asyncio.wait_for(logs_task, 10)
+                except asyncio.TimeoutError:
+                    pass
+                return code, capture.text()
+            except httpx.HTTPError as e:
+                return 1, f"docker API error: {e}"
+            finally:
+                if logs_task is not None and not logs_task.done():
+                    logs_task.cancel()
+                capture.close()
+                if cid is not None and self.remove:
+                    try:
+                        await self.http.delete(f"/containers/{cid}", params={"force": 1})
+                    except httpx.HTTPError:
+                        pass
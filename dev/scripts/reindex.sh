@@ -1,19 +1,66 @@
 #!/usr/bin/env bash
 set -euo pipefail
-# Placeholder for future corpus reindexing logic
+# Reindex a corpus through the batched ingest endpoint.
 # Usage: ./reindex.sh <dir>
+#   INGEST_URL  gateway base URL (default http://localhost:8000)
+#   BATCH_SIZE  documents per POST /ingest/batch request (default 500)
+#   MAX_RETRIES attempts per batch while the gateway answers 429/503 (default 30)
 
 dir=${1:-}
 if [[ -z "$dir" ]]; then
   echo "Usage: $0 <dir>" >&2
   exit 2
 fi
-find "$dir" -type f -name '*.md' -o -name '*.txt' | while read -r f; do
-  doc_id=$(basename "$f")
-  content=$(tr -d '\r' < "$f" | sed 's/"/\"/g')
-  curl -s http://localhost:8000/ingest \
-    -H 'Content-Type: application/json' \
-    -d "{\"doc_id\":\"$doc_id\",\"content\":\"$content\"}" | jq .
-  sleep 0.1
-done
+url="${INGEST_URL:-http://localhost:8000}/ingest/batch"
+batch_size=${BATCH_SIZE:-500}
+max_retries=${MAX_RETRIES:-30}
 
+batch=$(mktemp)
+headers=$(mktemp)
+body=$(mktemp)
+trap 'rm -f "$batch" "$headers" "$body"' EXIT
+n=0
+
+flush() {
+  [[ -s "$batch" ]] || return 0
+  local attempt status wait
+  for (( attempt = 1; ; attempt++ )); do
+    status=$(curl -sS "$url" -D "$headers" -o "$body" -w '%{http_code}' \
+      -H 'Content-Type: application/x-ndjson' \
+      --data-binary @"$batch")
+    case "$status" in
+      2??)
+        jq -c '{count, stream}' "$body"
+        break
+        ;;
+      429|503)
+        if (( attempt >= max_retries )); then
+          echo "giving up after $attempt attempts (HTTP $status): $(cat "$body")" >&2
+          exit 1
+        fi
+        # The gateway sends Retry-After in seconds; fall back to 5s.
+        wait=$(tr -d '\r' < "$headers" | awk 'tolower($1) == "retry-after:" {print $2}' | tail -n1)
+        [[ "$wait" =~ ^[0-9]+$ ]] || wait=5
+        echo "HTTP $status, retrying batch in ${wait}s" >&2
+        sleep "$wait"
+        ;;
+      *)
+        echo "HTTP $status: $(cat "$body")" >&2
+        exit 1
+        ;;
+    esac
+  done
+  : > "$batch"
+  n=0
+}
+
+# One NDJSON line per file; jq handles JSON escaping of the content.
+while IFS= read -r -d '' f; do
+  jq -nc --arg doc_id "$(basename "$f")" --rawfile content "$f" \
+    '{doc_id: $doc_id, content: ($content | gsub("\r"; ""))}' >> "$batch"
+  n=$((n + 1))
+  if (( n >= batch_size )); then
+    flush
+  fi
+done < <(find "$dir" -type f \( -name '*.md' -o -name '*.txt' \) -print0)
+flush
@@ -3,17 +3,178 @@ import os
 import json
 import uuid
 import time
-from typing import Any, Dict
+import asyncio
+import hashlib
+import math
+import tempfile
+from pathlib import Path
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
 
-import redis
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError, ResponseError
+from fastapi import FastAPI, HTTPException, Query, Request
+from pydantic import BaseModel, Field, ValidationError
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 QUEUE_STREAM = os.getenv("QUEUE_STREAM", "embeddings.incoming")
+MAX_BATCH = int(os.getenv("MAX_BATCH", "5000"))
+# Admission control. Producers get 429 + Retry-After once the pipeline
+# backlog would pass HIGH_WATER: undelivered + delivered-but-unacked entries
+# of QUEUE_GROUP on QUEUE_STREAM plus those of CLAIMED_GROUP on the
+# orchestrator's output, CLAIMED_STREAM. Both streams are trimmed to
+# STREAM_MAXLEN on XADD, so HIGH_WATER must stay below it, otherwise the
+# approximate trim can drop jobs nobody has processed yet.
+QUEUE_GROUP = os.getenv("QUEUE_GROUP", "orchestrators")
+CLAIMED_STREAM = os.getenv("CLAIMED_STREAM", "embeddings.claimed")
+CLAIMED_GROUP = os.getenv("CLAIMED_GROUP", "supervisors")
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "10000"))
+HIGH_WATER = int(os.getenv("HIGH_WATER", "8000"))
+QUEUE_SAMPLE_SEC = float(os.getenv("QUEUE_SAMPLE_SEC", "0.5"))
+if HIGH_WATER >= STREAM_MAXLEN:
+    raise RuntimeError(f"HIGH_WATER ({HIGH_WATER}) must be below STREAM_MAXLEN ({STREAM_MAXLEN})")
+# Connections per worker process; requests beyond this wait up to
+# REDIS_POOL_TIMEOUT seconds for a free connection instead of opening more.
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "64"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "2.0"))
+# Upper bound on the Redis work of a single request, summed over all of its
+# commands (pool waits included); body uploads do not count against it.
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "5.0"))
 
-r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
-app = FastAPI(title="Codex Embeddings API")
+# Content-addressed blob store for streamed uploads, shared with the supervisor:
+# blobs live at BLOB_DIR/<sha256[:2]>/<sha256> and are written once.
+BLOB_DIR = Path(os.getenv("BLOB_DIR", "/data/blobs"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+
+T = TypeVar("T")
+
+pool = aioredis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_POOL_SIZE,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_connect_timeout=REDIS_TIMEOUT,
+    socket_timeout=REDIS_TIMEOUT,
+    decode_responses=True,
+)
+r = aioredis.Redis(connection_pool=pool)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    await r.aclose()
+    await pool.disconnect()
+
+app = FastAPI(title="Codex Embeddings API", lifespan=lifespan)
+
+# Seconds of Redis time the current request has left, as a one-element list
+# so redis_call can charge it from within the handler's task.
+_redis_budget: ContextVar[Optional[List[float]]] = ContextVar("redis_budget", default=None)
+
+@app.middleware("http")
+async def redis_budget(request: Request, call_next):
+    _redis_budget.set([REDIS_TIMEOUT])
+    return await call_next(request)
+
+async def redis_call(awaitable: Awaitable[T]) -> T:
+    """Await a Redis command within what is left of the request's REDIS_TIMEOUT
+    budget; failures become 503s."""
+    budget = _redis_budget.get()
+    left = budget[0] if budget is not None else REDIS_TIMEOUT
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(awaitable, max(0.0, left))
+    except asyncio.TimeoutError:
+        raise HTTPException(503, "Redis timed out", headers={"Retry-After": "1"})
+    except RedisError as e:
+        raise HTTPException(503, f"Redis unavailable: {e}", headers={"Retry-After": "1"})
+    finally:
+        if budget is not None:
+            budget[0] -= time.monotonic() - started
+
+class QueueMonitor:
+    """Cached view of the pipeline backlog, refreshed at most every QUEUE_SAMPLE_SEC.
+
+    Thousands of concurrent ingests share one XLEN/XINFO GROUPS sample per
+    stream; documents admitted since the sample are added on top so a burst
+    cannot overshoot the high-water mark between samples.
+    """
+
+    STAGES = ((QUEUE_STREAM, QUEUE_GROUP), (CLAIMED_STREAM, CLAIMED_GROUP))
+
+    def __init__(self) -> None:
+        self.state: Dict[str, Any] = {}
+        self._at = 0.0
+        self._admitted = 0
+        self._drain_rate = 0.0  # entries/sec consumed by the last stage (EWMA)
+        self._lock = asyncio.Lock()
+
+    async def _groups(self, stream: str) -> List[Dict[str, Any]]:
+        try:
+            return await r.xinfo_groups(stream)
+        except ResponseError:  # stream deleted between XLEN and XINFO
+            return []
+
+    async def _read_stage(self, stream: str, name: str) -> Dict[str, Any]:
+        length = await redis_call(r.xlen(stream))
+        group = None
+        if length:
+            groups = await redis_call(self._groups(stream))
+            group = next((g for g in groups if g.get("name") == name), None)
+        pending = int(group["pending"]) if group else 0
+        lag = group.get("lag") if group else None
+        # Without a group (or when Redis cannot compute lag) every entry counts.
+        backlog = int(lag) + pending if lag is not None else length
+        return {
+            "stream": stream,
+            "group": name,
+            "length": length,
+            "pending": pending,
+            "lag": lag,
+            "backlog": backlog,
+            "entries_read": int(group.get("entries-read") or 0) if group else 0,
+        }
+
+    async def _read(self) -> Dict[str, Any]:
+        stages = [await self._read_stage(stream, name) for stream, name in self.STAGES]
+        return {
+            "stages": stages,
+            "backlog": sum(s["backlog"] for s in stages),
+            # Envelopes leave the pipeline once the last stage consumes them.
+            "entries_read": stages[-1]["entries_read"],
+        }
+
+    async def sample(self) -> Dict[str, Any]:
+        if time.monotonic() - self._at < QUEUE_SAMPLE_SEC:
+            return self.state
+        async with self._lock:
+            now = time.monotonic()
+            if now - self._at < QUEUE_SAMPLE_SEC:
+                return self.state
+            state = await self._read()
+            if self.state and now > self._at:
+                rate = max(0, state["entries_read"] - self.state["entries_read"]) / (now - self._at)
+                self._drain_rate = 0.7 * self._drain_rate + 0.3 * rate if self._drain_rate else rate
+            state["drain_rate"] = round(self._drain_rate, 2)
+            state["high_water"] = HIGH_WATER
+            self.state, self._at, self._admitted = state, now, 0
+            return state
+
+    async def admit(self, n: int = 1) -> None:
+        """Reserve room for n envelopes or raise 429 with a Retry-After estimate."""
+        state = await self.sample()
+        backlog = state["backlog"] + self._admitted
+        if backlog + n > HIGH_WATER:
+            excess = backlog + n - HIGH_WATER
+            retry = min(60, max(1, math.ceil(excess / self._drain_rate))) if self._drain_rate else 5
+            raise HTTPException(
+                429,
+                f"Queue backlog {backlog} is at the high-water mark ({HIGH_WATER}); retry later",
+                headers={"Retry-After": str(retry)},
+            )
+        self._admitted += n
+
+queue = QueueMonitor()
 
 class IngestRequest(BaseModel):
     doc_id: str
@@ -30,13 +191,26 @@ class IngestResponse(BaseModel):
     job_id: str
     stream: str
 
-@app.post("/ingest", response_model=IngestResponse)
-def ingest(req: IngestRequest):
-    if not (req.content or req.uri):
-        raise HTTPException(400, "Either content or uri must be provided")
-    job_id = str(uuid.uuid4())
-    envelope = {
-        "job_id": job_id,
+class BatchJob(BaseModel):
+    doc_id: str
+    job_id: str
+
+class BatchIngestResponse(BaseModel):
+    stream: str
+    count: int
+    jobs: List[BatchJob]
+
+class BlobRef(BaseModel):
+    sha256: str
+    size: int
+
+class UploadResponse(IngestResponse):
+    blob: BlobRef
+    deduplicated: bool
+
+def build_envelope(req: IngestRequest, blob: BlobRef | None = None, content_type: str = "text/plain") -> Dict[str, Any]:
+    return {
+        "job_id": str(uuid.uuid4()),
         "created_at_utc": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "source": "api",
         "model": req.model,
@@ -49,16 +223,152 @@ def ingest(req: IngestRequest):
             "uri": req.uri,
             "metadata": req.metadata,
             "version": req.version,
-            "content_type": "text/plain",
+            "content_type": content_type,
+            # Streamed uploads carry only a reference; the supervisor reads the blob.
+            "blob": blob.model_dump() if blob else None,
         },
     }
-    r.xadd(QUEUE_STREAM, {"envelope": json.dumps(envelope)}, maxlen=10000, approximate=True)
-    return IngestResponse(job_id=job_id, stream=QUEUE_STREAM)
+
+def blob_path(sha256: str) -> Path:
+    return BLOB_DIR / sha256[:2] / sha256
+
+async def store_blob(request: Request) -> tuple[BlobRef, bool]:
+    """Stream the request body into the blob store; returns (ref, deduplicated).
+
+    The body is hashed while it is written to a temp file in BLOB_DIR, then
+    renamed to its content address, so memory use does not depend on the
+    document size and identical uploads are stored once.
+    """
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(413, f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                h.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        if size == 0:
+            raise HTTPException(400, "Empty upload")
+        ref = BlobRef(sha256=h.hexdigest(), size=size)
+        dest = blob_path(ref.sha256)
+        if dest.exists():
+            return ref, True
+        dest.parent.mkdir(exist_ok=True)
+        os.replace(tmp, dest)
+        return ref, False
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+@app.post("/ingest", response_model=IngestResponse)
+async def ingest(req: IngestRequest):
+    if not (req.content or req.uri):
+        raise HTTPException(400, "Either content or uri must be provided")
+    await queue.admit()
+    envelope = build_envelope(req)
+    await redis_call(r.xadd(QUEUE_STREAM, {"envelope": json.dumps(envelope)}, maxlen=STREAM_MAXLEN, approximate=True))
+    return IngestResponse(job_id=envelope["job_id"], stream=QUEUE_STREAM)
+
+def parse_batch(body: bytes, content_type: str) -> List[Any]:
+    """Documents from a JSON array or NDJSON (one document per line) body."""
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(400, f"Malformed batch body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(400, "Batch body must be a JSON array or NDJSON")
+    return items
+
+@app.post("/ingest/batch", response_model=BatchIngestResponse)
+async def ingest_batch(request: Request):
+    """Enqueue many documents in one request and one Redis round-trip.
+
+    The batch is all-or-nothing: any invalid document rejects the whole batch
+    with its per-index errors, and valid batches are written in a single
+    MULTI/EXEC pipeline.
+    """
+    items = parse_batch(await request.body(), request.headers.get("content-type", ""))
+    if not items:
+        raise HTTPException(400, "Batch is empty")
+    if len(items) > MAX_BATCH:
+        raise HTTPException(413, f"Batch too large: {len(items)} documents (max {MAX_BATCH})")
+    envelopes: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for idx, item in enumerate(items):
+        try:
+            req = IngestRequest.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": idx, "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+            continue
+        if not (req.content or req.uri):
+            errors.append({"index": idx, "errors": ["Either content or uri must be provided"]})
+            continue
+        envelopes.append(build_envelope(req))
+    if errors:
+        raise HTTPException(422, {"invalid": len(errors), "documents": errors[:100]})
+    await queue.admit(len(envelopes))
+
+    async with r.pipeline(transaction=True) as pipe:
+        for envelope in envelopes:
+            pipe.xadd(QUEUE_STREAM, {"envelope": json.dumps(envelope)}, maxlen=STREAM_MAXLEN, approximate=True)
+        await redis_call(pipe.execute())
+    return BatchIngestResponse(
+        stream=QUEUE_STREAM,
+        count=len(envelopes),
+        jobs=[BatchJob(doc_id=e["doc"]["doc_id"], job_id=e["job_id"]) for e in envelopes],
+    )
+
+@app.post("/ingest/upload", response_model=UploadResponse)
+async def ingest_upload(
+    request: Request,
+    doc_id: str = Query(...),
+    model: str = Query(default="text-embedding-3-small"),
+    collection: str = Query(default="embeddings__demo__text-embedding-3-small__v1"),
+    version: str | None = Query(default=None),
+    metadata: str | None = Query(default=None, description="JSON object"),
+    repo_path: str | None = Query(default=None),
+    allowed_domains: str | None = Query(default="api.openai.com"),
+):
+    """Ingest a large document sent as the raw request body (not JSON).
+
+    Only a blob reference goes into the stream envelope, so Redis memory and
+    per-hop copies no longer grow with document size.
+    """
+    try:
+        req = IngestRequest(
+            doc_id=doc_id,
+            model=model,
+            collection=collection,
+            metadata=json.loads(metadata) if metadata else {},
+            repo_path=repo_path,
+            allowed_domains=allowed_domains,
+            **({"version": version} if version else {}),
+        )
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(422, str(e))
+    # Admit before reading the body so rejected uploads cost no disk I/O.
+    await queue.admit()
+    ref, deduplicated = await store_blob(request)
+    content_type = request.headers.get("content-type", "text/plain").split(";")[0].strip()
+    envelope = build_envelope(req, blob=ref, content_type=content_type)
+    await redis_call(r.xadd(QUEUE_STREAM, {"envelope": json.dumps(envelope)}, maxlen=STREAM_MAXLEN, approximate=True))
+    return UploadResponse(job_id=envelope["job_id"], stream=QUEUE_STREAM, blob=ref, deduplicated=deduplicated)
+
+@app.get("/queue")
+async def queue_status():
+    """Current backlog of the ingest and claimed streams as used for admission control."""
+    return await queue.sample()
 
 @app.get("/healthz")
-def healthz():
+async def healthz():
     try:
-        r.ping()
+        await asyncio.wait_for(r.ping(), REDIS_TIMEOUT)
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(500, str(e))
@@ -2,15 +2,28 @@ import os
 import json
 import time
 import random
-from typing import Optional
+import socket
+from typing import Dict, Tuple
 
 import redis
+import yaml
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 IN_STREAM = os.getenv("IN_STREAM", "embeddings.incoming")
 OUT_STREAM = os.getenv("OUT_STREAM", "embeddings.claimed")
 GROUP = os.getenv("GROUP", "orchestrators")
+# Must match the gateway's STREAM_MAXLEN: its HIGH_WATER admission check
+# counts OUT_STREAM's backlog too, so the trim only drops processed entries.
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "10000"))
+# Unique per replica so several orchestrators can share the consumer group.
+CONSUMER = os.getenv("CONSUMER", f"orchestrator-{socket.gethostname()}")
+# Fallback for models missing from MODELS_CONFIG.
 RPS_LIMIT = int(os.getenv("RPS_LIMIT", "60"))
+MODELS_CONFIG = os.getenv("MODELS_CONFIG", "/app/configs/models.yaml")
+# Seconds of quota a bucket may accumulate while idle (burst size).
+BURST_SEC = float(os.getenv("BURST_SEC", "1.0"))
+# Token estimate for documents whose size is unknown here (uri-only).
+DEFAULT_DOC_TOKENS = int(os.getenv("DEFAULT_DOC_TOKENS", "512"))
 
 r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
 
@@ -21,23 +34,98 @@ except redis.ResponseError as e:
     if "BUSYGROUP" not in str(e):
         raise
 
-last_tick = 0.0
+
+def load_limits(path: str) -> Dict[str, Tuple[float, float]]:
+    """model -> (rps_limit, tpm_limit) from models.yaml; {} if it is missing."""
+    try:
+        with open(path) as f:
+            cfg = yaml.safe_load(f) or {}
+    except OSError as e:
+        print(f"models config {path} not readable ({e}); using RPS_LIMIT={RPS_LIMIT} for all models", flush=True)
+        return {}
+    return {
+        name: (float(m.get("rps_limit") or RPS_LIMIT), float(m.get("tpm_limit") or 0))
+        for name, m in (cfg.get("models") or {}).items()
+    }
+
+
+# Two token buckets per model, shared by every orchestrator replica: one
+# for requests (rps_limit/sec) and one for estimated tokens (tpm_limit/60
+# per sec). Both are checked and charged in one atomic step against Redis'
+# clock. A job larger than the token bucket is let through once the bucket
+# is full and drives it negative, so it delays later jobs instead of
+# waiting forever. Returns {1, 0} when admitted, else {0, wait_ms}.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rps, rcap = tonumber(ARGV[1]), tonumber(ARGV[2])
+local trate, tcap, cost = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+
+local function level(key, rate, cap)
+  local b = redis.call('HMGET', key, 'level', 'ts')
+  local lvl = tonumber(b[1]) or cap
+  local ts = tonumber(b[2]) or now
+  return math.min(cap, lvl + math.max(0, now - ts) * rate)
+end
+
+local function store(key, lvl, rate, cap)
+  redis.call('HSET', key, 'level', tostring(lvl), 'ts', tostring(now))
+  redis.call('EXPIRE', key, math.ceil((cap - lvl) / rate) + 1)
+end
+
+local req = level(KEYS[1], rps, rcap)
+local wait = 0
+if req < 1 then wait = (1 - req) / rps end
+local tok = 0
+if trate > 0 then
+  tok = level(KEYS[2], trate, tcap)
+  local need = math.min(cost, tcap)
+  if tok < need then wait = math.max(wait, (need - tok) / trate) end
+end
+if wait > 0 then return {0, math.ceil(wait * 1000)} end
+
+store(KEYS[1], req - 1, rps, rcap)
+if trate > 0 then store(KEYS[2], tok - cost, trate, tcap) end
+return {1, 0}
+"""
+
+token_bucket = r.register_script(TOKEN_BUCKET_LUA)
+limits = load_limits(MODELS_CONFIG)
+
+
+def estimate_tokens(envelope: Dict) -> int:
+    """~4 characters per token for inline content or uploaded blobs."""
+    doc = envelope.get("doc") or {}
+    if doc.get("content"):
+        return max(1, len(doc["content"]) // 4)
+    if doc.get("blob"):
+        return max(1, int(doc["blob"].get("size", 0)) // 4)
+    return DEFAULT_DOC_TOKENS
+
+
+def acquire(model: str, tokens: int) -> None:
+    """Block until the model's shared request and token budgets admit this job."""
+    rps, tpm = limits.get(model, (float(RPS_LIMIT), 0.0))
+    tok_rate = tpm / 60.0
+    keys = [f"ratelimit:{{{model}}}:requests", f"ratelimit:{{{model}}}:tokens"]
+    args = [rps, max(1.0, rps * BURST_SEC), tok_rate, max(1.0, tok_rate * BURST_SEC), tokens]
+    while True:
+        allowed, wait_ms = token_bucket(keys=keys, args=args)
+        if allowed:
+            return
+        # Jitter so replicas woken by the same refill do not collide.
+        time.sleep(wait_ms / 1000.0 * random.uniform(1.0, 1.2))
+
 
 while True:
-    resp = r.xreadgroup(GROUP, "orchestrator-1", {IN_STREAM: ">"}, count=1, block=5000)
+    resp = r.xreadgroup(GROUP, CONSUMER, {IN_STREAM: ">"}, count=1, block=5000)
     if not resp:
         continue
     _, messages = resp[0]
     for msg_id, data in messages:
         envelope = json.loads(data["envelope"])  # type: ignore
-        now = time.time()
-        # simple rate limiting (RPS)
-        wait = max(0.0, (1.0 / max(1, RPS_LIMIT)) - (now - last_tick))
-        if wait > 0:
-            time.sleep(wait)
-        last_tick = time.time()
+        acquire(envelope.get("model") or "default", estimate_tokens(envelope))
 
         # forward to OUT_STREAM with same envelope
-        r.xadd(OUT_STREAM, {"envelope": json.dumps(envelope)}, maxlen=10000, approximate=True)
+        r.xadd(OUT_STREAM, {"envelope": json.dumps(envelope)}, maxlen=STREAM_MAXLEN, approximate=True)
         r.xack(IN_STREAM, GROUP, msg_id)
-
@@ -17,6 +17,7 @@ DEFAULT_COLLECTION = os.getenv("DEFAULT_COLLECTION", "embeddings__demo__text-emb
 MODEL_NAME = os.getenv("MODEL_NAME", "text-embedding-3-small")
 RUNNER_IMAGE = os.getenv("RUNNER_IMAGE", "codex-runner:latest")
 DEFAULT_ALLOWED_DOMAINS = os.getenv("DEFAULT_ALLOWED_DOMAINS", "api.openai.com")
+BLOB_DIR = os.getenv("BLOB_DIR", "/data/blobs")  # shared with the api-gateway
 
 r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
 
@@ -61,6 +62,13 @@ def docker_run_runner(input_path: str, output_path: str, allowed_domains: str |
         return 10
 
 
+def read_blob(ref: Dict) -> str:
+    """Content of a streamed upload, read from the blob store only when the job runs."""
+    sha = ref["sha256"]
+    with open(os.path.join(BLOB_DIR, sha[:2], sha), encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
 def ensure_collection(name: str, vector_size: int = 1536, distance: str = "Cosine") -> None:
     with httpx.Client(timeout=15.0) as client:
         r1 = client.get(f"{QDRANT_URL}/collections/{name}")
@@ -90,8 +98,16 @@ while True:
     for msg_id, data in messages:
         envelope = json.loads(data["envelope"])  # type: ignore
         doc = envelope["doc"]
-        text = doc.get("content") or f"URI:{doc.get('uri')}"
         job_id = envelope["job_id"]
+        if doc.get("blob"):
+            try:
+                text = read_blob(doc["blob"])
+            except OSError as e:
+                r.xack(IN_STREAM, GROUP, msg_id)
+                print(f"job {job_id} failed: blob {doc['blob'].get('sha256')} unreadable: {e}")
+                continue
+        else:
+            text = doc.get("content") or f"URI:{doc.get('uri')}"
         model = envelope.get("model", MODEL_NAME)
         collection = envelope.get("collection", DEFAULT_COLLECTION)
         repo_path = envelope.get("repo_path")
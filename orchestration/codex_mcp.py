@@ -1,18 +1,81 @@
 import os
 import subprocess
 import textwrap
-from typing import Dict, Any
+import threading
+from typing import Callable, Dict, Any, Optional
 
-from runner import CodexRunner
+from orchestration.fix_cache import FixCache, repo_tree_hash
+from runner import CodexRunner, LogCapture
 
 # Minimal wrapper to prepare Codex prompts and dispatch work to the containerized CLI.
 # This avoids embedding secrets and keeps runs ephemeral.
 
-def propose_fix(repo_path: str, failure_summary: str, files_hint: str = "") -> Dict[str, Any]:
+# Warm containers kept per repo by default_runner(); 0 starts a fresh
+# container for every proposal.
+POOL_SIZE = int(os.getenv("CODEX_POOL_SIZE", "2"))
+
+_default_runner: Optional[CodexRunner] = None
+_default_cache: Optional[FixCache] = None
+# Speculative fixes call propose_fix from several threads at once; only one
+# of them may create the shared runner (and its image refresh thread).
+_defaults_lock = threading.Lock()
+
+
+def default_runner() -> CodexRunner:
+    """Runner reused across propose_fix calls (backed by the shared Docker client).
+
+    With POOL_SIZE > 0 proposals are exec'd in pooled containers: the first
+    one for a repo starts the rest of its pool, later ones skip container
+    create/start/teardown.
+    """
+    global _default_runner
+    with _defaults_lock:
+        if _default_runner is None:
+            _default_runner = CodexRunner(pool_size=POOL_SIZE)
+            _default_runner.warm_image(background=True)
+        return _default_runner
+
+
+def default_cache() -> FixCache:
+    global _default_cache
+    with _defaults_lock:
+        if _default_cache is None:
+            _default_cache = FixCache()
+        return _default_cache
+
+
+def _image_digest(runner: CodexRunner) -> Optional[str]:
+    try:
+        return runner.pinned_image or runner.resolve_image(pull=False)
+    except Exception:
+        return None
+
+
+def propose_fix(
+    repo_path: str,
+    failure_summary: str,
+    files_hint: str = "",
+    on_output: Optional[Callable[[str, str], None]] = None,
+    runner: Optional[CodexRunner] = None,
+    cache: Optional[FixCache] = None,
+    bypass_cache: bool = False,
+    variant: str = "",
+    labels: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
     """Ask Codex to propose a minimal diff to fix the described failure.
-    Returns a dict with keys: {exit_code, logs} and lets the caller decide how to apply.
+    Returns a dict with keys: {exit_code, logs, cached, cache_key} and lets the caller decide how to apply.
+    on_output(channel, line) is called live for each line the container prints.
+    Proposals that look like a diff are cached by (prompt, repo tree hash,
+    image digest) under cache_key (None when the repo or image cannot be
+    hashed); callers should FixCache.delete() it if the diff does not apply.
+    bypass_cache skips the lookup but still stores the fresh result.
+    variant is an optional extra instruction used to get distinct candidate
+    patches for the same failure. labels are added to the job container so
+    callers can kill it early (CodexRunner.kill_labelled); labelled jobs
+    never run in the runner's pool.
     """
-    runner = CodexRunner()
+    runner = runner or default_runner()
+    cache = cache or default_cache()
 
     # Compose a prompt that is explicit and bounded.
     prompt = textwrap.dedent(f"""
@@ -30,6 +93,19 @@ def propose_fix(repo_path: str, failure_summary: str, files_hint: str = "") -> D
     - Respond with a machine-readable unified diff (git diff -U0 style) ONLY.
     - No prose. No comments. Diff must apply cleanly from repo root.
     """)
+    if variant:
+        prompt += f"- Approach: {variant}\n"
+
+    cache_key = None
+    tree, digest = repo_tree_hash(repo_path), _image_digest(runner)
+    if tree and digest:
+        cache_key = FixCache.key(prompt, tree, digest)
+        hit = None if bypass_cache else cache.get(cache_key)
+        if hit is not None:
+            if on_output is not None:
+                for line in hit["logs"].splitlines():
+                    on_output("stdout", line)
+            return {**hit, "cached": True, "cache_key": cache_key}
 
     # We assume codex CLI supports a 'prompt' subcommand that prints an answer to stdout.
     args = [
@@ -46,15 +122,24 @@ def propose_fix(repo_path: str, failure_summary: str, files_hint: str = "") -> D
         host_job_dir=repo_path,
         entrypoint=None,
         timeout_sec=180,
+        capture=LogCapture(on_line=on_output),
+        labels=labels,
+        # Labelled jobs get their own container so killing them by label
+        # cannot take down a shared pooled one.
+        pooled=labels is None,
     )
-    return {"exit_code": code, "logs": logs}
+    result = {"exit_code": code, "logs": logs}
+    # Prose or error text is not worth replaying: only cache actual diffs.
+    if cache_key and code == 0 and logs.strip().startswith("diff"):
+        cache.put(cache_key, result)
+    return {**result, "cached": False, "cache_key": cache_key}
 
 
 def apply_patch(repo_path: str, diff_text: str) -> int:
     """Apply a unified diff in the host repo using 'git apply --index'. Returns exit code."""
     env = os.environ.copy()
     proc = subprocess.run(
-        ["bash", "-lc", "git -C "$REPO" apply --index -"],
+        ["bash", "-lc", 'git -C "$REPO" apply --index -'],
         input=diff_text.encode("utf-8"),
         env={**env, "REPO": repo_path},
         stdout=subprocess.PIPE,
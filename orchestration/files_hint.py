@@ -0,0 +1,225 @@
+import ast
+import json
+import math
+import os
+import re
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from orchestration.fsutil import write_atomic
+from orchestration.step_cache import SKIP_DIRS
+from orchestration.summarize import ANSI
+
+# Builds propose_fix's files_hint from a step failure: file paths and line
+# numbers named in the output, files defining symbols the output mentions,
+# and project modules those files import (one hop). Candidates are ranked by
+# how directly the failure points at them, then by how recently git saw them
+# change. The per-file symbol/import index is cached between runs and only
+# re-parsed for files whose size or mtime changed.
+
+_LOCATION = re.compile(r'(?:File "(?P<tb>[^"]+)", line (?P<tbline>\d+))|(?P<path>[\w./-]+\.pyi?)(?::(?P<line>\d+))?')
+_QUOTED_NAME = re.compile(r"['\"]([A-Za-z_]\w{2,})['\"]")
+
+# Rank weights: where the failure happened beats what it mentions beats what
+# those files import.
+_LOCATED, _MENTIONED, _IMPORTED = 100, 40, 10
+# Only changes within this many days of the newest commit are called out.
+# The hint is part of the cached prompt, so it must depend on the repo
+# alone, never on the current time.
+RECENT_DAYS = 30
+
+
+def _module_name(rel: str) -> str:
+    parts = rel[:-3].split("/") if rel.endswith(".py") else rel.split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _parse(path: Path, module: str) -> Dict[str, list]:
+    """Top-level symbols and absolute import targets of one Python file."""
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (SyntaxError, ValueError, OSError):
+        return {"symbols": [], "imports": []}
+    symbols: List[str] = []
+    imports: List[str] = []
+    package = module if path.name == "__init__.py" else module.rpartition(".")[0]
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbols.append(node.name)
+        elif isinstance(node, ast.Assign):
+            symbols += [t.id for t in node.targets if isinstance(t, ast.Name)]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                anchor = package.split(".") if package else []
+                anchor = anchor[: len(anchor) - (node.level - 1)] if node.level > 1 else anchor
+                base = ".".join(filter(None, [*anchor, base]))
+            imports.append(base)
+            # `from pkg import mod` may name a submodule rather than a symbol.
+            imports += [f"{base}.{a.name}" if base else a.name for a in node.names]
+    return {"symbols": symbols, "imports": sorted(set(filter(None, imports)))}
+
+
+class SymbolIndex:
+    """Per-file symbols and imports for a repo's Python files, cached on disk."""
+
+    def __init__(self, cache_path: Path) -> None:
+        self.cache_path = Path(cache_path)
+        self.files: Dict[str, Dict] = {}
+
+    def load(self, repo: Path) -> "SymbolIndex":
+        try:
+            cached = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = {}
+        old = cached.get("files", {}) if cached.get("repo") == str(repo.resolve()) else {}
+        files: Dict[str, Dict] = {}
+        for dirpath, dirnames, filenames in os.walk(repo):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for fn in filenames:
+                if not fn.endswith((".py", ".pyi")):
+                    continue
+                path = Path(dirpath) / fn
+                rel = path.relative_to(repo).as_posix()
+                st = path.stat()
+                prev = old.get(rel)
+                if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+                    files[rel] = prev
+                    continue
+                files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, **_parse(path, _module_name(rel))}
+        self.files = files
+        if files != old:
+            write_atomic(self.cache_path, json.dumps({"repo": str(repo.resolve()), "files": files}))
+        return self
+
+    def modules(self) -> Dict[str, str]:
+        """Dotted module name → repo-relative path (src/ layouts included)."""
+        out = {}
+        for rel in self.files:
+            if rel.endswith(".py"):
+                name = _module_name(rel)
+                out[name] = rel
+                if name.startswith("src."):
+                    out.setdefault(name[4:], rel)
+        return out
+
+    def definers(self) -> Dict[str, List[str]]:
+        """Top-level symbol → files defining it."""
+        out: Dict[str, List[str]] = {}
+        for rel, entry in self.files.items():
+            for sym in entry["symbols"]:
+                out.setdefault(sym, []).append(rel)
+        return out
+
+
+def _repo_relative(repo: Path, raw: str) -> Optional[str]:
+    p = Path(raw)
+    if p.is_absolute():
+        try:
+            p = p.resolve().relative_to(repo.resolve())
+        except ValueError:
+            return None  # outside the repo: stdlib, site-packages
+    rel = p.as_posix()
+    while rel.startswith("./"):
+        rel = rel[2:]
+    return rel if (repo / rel).is_file() else None
+
+
+def recent_changes(repo: Path, commits: int = 200) -> Dict[str, float]:
+    """File → timestamp of its latest change in the last N commits; files with
+    uncommitted changes map to math.inf."""
+    changed: Dict[str, float] = {}
+    try:
+        log = subprocess.run(
+            ["git", "-C", str(repo), "log", f"-n{commits}", "--name-only", "--format=%x1e%ct"],
+            capture_output=True, text=True, timeout=30,
+        )
+        status = subprocess.run(
+            ["git", "-C", str(repo), "status", "--porcelain", "--no-renames"],
+            capture_output=True, text=True, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return changed
+    if log.returncode == 0:
+        stamp = 0.0
+        for line in log.stdout.split("\n"):  # splitlines() would split on \x1e too
+            if line.startswith("\x1e"):
+                stamp = float(line[1:] or 0)
+            elif line and line not in changed:
+                changed[line] = stamp
+    if status.returncode == 0:
+        for line in status.stdout.splitlines():
+            changed[line[3:].strip('"')] = math.inf
+    return changed
+
+
+def candidate_files(repo: Path, failure_lines: Iterable[str], index: SymbolIndex) -> Dict[str, Tuple[int, Set[int]]]:
+    """Repo files the failure points at → (score, referenced line numbers)."""
+    found: Dict[str, Tuple[int, Set[int]]] = {}
+    definers = index.definers()
+    names: Set[str] = set()
+
+    def _bump(rel: str, weight: int, line: Optional[int] = None) -> None:
+        score, lines = found.get(rel, (0, set()))
+        if line:
+            lines.add(line)
+        found[rel] = (score + weight, lines)
+
+    for text in failure_lines:
+        text = ANSI.sub("", text)  # --color=yes splits "path:line" with escapes
+        for m in _LOCATION.finditer(text):
+            rel = _repo_relative(repo, m["tb"] or m["path"])
+            if rel is not None:
+                line = m["tbline"] or m["line"]
+                _bump(rel, _LOCATED if line else _MENTIONED, int(line) if line else None)
+        names.update(_QUOTED_NAME.findall(text))
+
+    # NameError / AttributeError / ImportError style messages quote the symbol.
+    for name in names:
+        for rel in definers.get(name, [])[:3]:
+            _bump(rel, _MENTIONED)
+
+    modules = index.modules()
+    for rel in list(found):
+        for target in index.files.get(rel, {}).get("imports", []):
+            dep = modules.get(target)
+            if dep and dep != rel:
+                _bump(dep, _IMPORTED)
+    return found
+
+
+def files_hint(
+    repo: Path,
+    failure_lines: Iterable[str],
+    cache_path: Path,
+    limit: int = 8,
+) -> str:
+    """Compact "- path:lines (why)" block of the files most likely to need a change."""
+    repo = Path(repo)
+    index = SymbolIndex(cache_path).load(repo)
+    found = candidate_files(repo, failure_lines, index)
+    if not found:
+        return ""
+    recent = recent_changes(repo)
+    newest = max((t for t in recent.values() if t != math.inf), default=0.0)
+    ranked = sorted(found.items(), key=lambda kv: (-kv[1][0], -recent.get(kv[0], 0.0), kv[0]))
+    out = []
+    for rel, (score, lines) in ranked[:limit]:
+        loc = rel + (":" + ",".join(str(n) for n in sorted(lines)[:5]) if lines else "")
+        why = "failure location" if score >= _LOCATED else ("mentioned" if score >= _MENTIONED else "imported")
+        if recent.get(rel) == math.inf:
+            why += ", uncommitted changes"
+        elif rel in recent and newest - recent[rel] < RECENT_DAYS * 86400:
+            day = datetime.fromtimestamp(recent[rel], timezone.utc).strftime("%Y-%m-%d")
+            why += f", last changed {day}"
+        symbols = index.files.get(rel, {}).get("symbols", [])
+        defines = f"; defines {', '.join(symbols[:6])}" if symbols else ""
+        out.append(f"- {loc} ({why}{defines})")
+    return "\n".join(out)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from orchestration.fsutil import write_atomic
+
+# On-disk, content-addressed cache for Codex fix proposals.
+# Entries are JSON files named by sha256(prompt, repo tree hash, image digest);
+# file mtime doubles as the LRU clock.
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "CODEX_FIX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "codex-fix")
+)
+
+
+def repo_tree_hash(repo_path: str) -> Optional[str]:
+    """Hash of HEAD's tree plus any uncommitted changes; None if not a git repo."""
+    try:
+        tree = subprocess.run(
+            ["git", "-C", repo_path, "rev-parse", "HEAD^{tree}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "-C", repo_path, "diff", "HEAD", "--binary"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return hashlib.sha256(tree + b"\0" + dirty).hexdigest()
+
+
+class FixCache:
+    def __init__(
+        self,
+        root: str = DEFAULT_CACHE_DIR,
+        ttl_sec: float = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.root = Path(root)
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if time.time() - entry["created_at"] > self.ttl_sec:
+                path.unlink()
+                raise FileNotFoundError(path)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry["value"]
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        write_atomic(self._path(key), json.dumps({"created_at": time.time(), "value": value}))
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        """Forget an entry, e.g. a cached proposal that turned out not to apply."""
+        self._path(key).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        entries = []
+        now = time.time()
+        removed = 0
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.ttl_sec:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,15 @@
+import os
+import threading
+from pathlib import Path
+
+# Small filesystem helpers shared by the on-disk caches.
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Write text to path via a per-process, per-thread temp file and
+    os.replace, so concurrent writers and readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
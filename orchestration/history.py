@@ -0,0 +1,263 @@
+import argparse
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# SQLite run history for pipelines.py: one row per run, per step attempt and
+# per Codex fix request. `python -m orchestration.history --runs-dir runs`
+# prints step timing percentiles, flaky steps and the fix success rate.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    stamp TEXT NOT NULL,
+    chain TEXT,
+    repo TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    rc INTEGER
+);
+CREATE TABLE IF NOT EXISTS step_attempts (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step_id TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'step',   -- step | quick
+    started_at REAL NOT NULL,
+    duration_sec REAL NOT NULL,
+    rc INTEGER NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    patched INTEGER NOT NULL DEFAULT 0,  -- a patch was applied since the previous attempt
+    inputs_key TEXT
+);
+CREATE INDEX IF NOT EXISTS step_attempts_step ON step_attempts(step_id);
+CREATE TABLE IF NOT EXISTS fixes (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    latency_sec REAL NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    exit_code INTEGER,
+    outcome TEXT NOT NULL  -- applied | invalid | apply_failed | dry_run | validated | no_candidate
+);
+"""
+
+# "applied" only means git apply succeeded; such a fix counts as a success
+# when the next full run of the step after it (before any further fix)
+# passed. "validated" fixes already passed the step in a snapshot.
+FIX_APPLIED = ("applied", "validated")
+
+
+class RunHistory:
+    def __init__(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Steps run on worker threads; serialize access to one connection.
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _exec(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def start_run(self, stamp: str, chain: str, repo: str) -> int:
+        cur = self._exec(
+            "INSERT INTO runs (stamp, chain, repo, started_at) VALUES (?, ?, ?, ?)",
+            (stamp, chain, repo, time.time()),
+        )
+        return int(cur.lastrowid)
+
+    def finish_run(self, run_id: int, rc: int) -> None:
+        self._exec("UPDATE runs SET finished_at = ?, rc = ? WHERE id = ?", (time.time(), rc, run_id))
+
+    def record_attempt(
+        self,
+        run_id: int,
+        step_id: str,
+        attempt: int,
+        started_at: float,
+        rc: int,
+        kind: str = "step",
+        cached: bool = False,
+        patched: bool = False,
+        inputs_key: Optional[str] = None,
+    ) -> None:
+        self._exec(
+            "INSERT INTO step_attempts (run_id, step_id, attempt, kind, started_at, duration_sec,"
+            " rc, cached, patched, inputs_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, step_id, attempt, kind, started_at, time.time() - started_at,
+             rc, int(cached), int(patched), inputs_key),
+        )
+
+    def record_fix(
+        self,
+        run_id: int,
+        step_id: str,
+        started_at: float,
+        outcome: str,
+        cached: bool = False,
+        exit_code: Optional[int] = None,
+        ended_at: Optional[float] = None,
+    ) -> None:
+        """ended_at marks when the proposal arrived (defaults to now)."""
+        latency = (ended_at or time.time()) - started_at
+        self._exec(
+            "INSERT INTO fixes (run_id, step_id, started_at, latency_sec, cached, exit_code, outcome)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, step_id, started_at, latency, int(cached), exit_code, outcome),
+        )
+
+    def passed_on(self, step_id: str, inputs_key: str) -> bool:
+        """Whether an uncached attempt of step_id ever passed with these exact inputs."""
+        row = self._exec(
+            "SELECT 1 FROM step_attempts WHERE step_id = ? AND inputs_key = ? AND rc = 0"
+            " AND cached = 0 AND kind = 'step' LIMIT 1",
+            (step_id, inputs_key),
+        ).fetchone()
+        return row is not None
+
+    def flakiness(self, step_id: str, last_runs: int = 50) -> Dict[str, float]:
+        """flaky_steps() entry for one step; {} if it has never flaked."""
+        with self._lock:
+            return flaky_steps(self._db, last_runs).get(step_id, {})
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; values must be sorted."""
+    if not values:
+        return 0.0
+    idx = max(0, min(len(values) - 1, math.ceil(pct / 100.0 * len(values)) - 1))
+    return values[idx]
+
+
+def step_timings(db: sqlite3.Connection, last_runs: int) -> Dict[str, Dict[str, float]]:
+    rows = db.execute(
+        "SELECT step_id, duration_sec FROM step_attempts"
+        " WHERE kind = 'step' AND cached = 0 AND run_id IN"
+        " (SELECT id FROM runs ORDER BY id DESC LIMIT ?)",
+        (last_runs,),
+    ).fetchall()
+    by_step: Dict[str, List[float]] = {}
+    for step_id, dur in rows:
+        by_step.setdefault(step_id, []).append(dur)
+    out = {}
+    for step_id, durs in by_step.items():
+        durs.sort()
+        out[step_id] = {"n": len(durs), "p50": _percentile(durs, 50), "p95": _percentile(durs, 95)}
+    return out
+
+
+def flaky_steps(db: sqlite3.Connection, last_runs: int) -> Dict[str, Dict[str, float]]:
+    """Per step: runs in which it failed and later passed on identical inputs
+    (same inputs_key when recorded) with no patch applied in between."""
+    rows = db.execute(
+        "SELECT run_id, step_id, rc, patched, inputs_key FROM step_attempts"
+        " WHERE kind = 'step' AND cached = 0 AND run_id IN"
+        " (SELECT id FROM runs ORDER BY id DESC LIMIT ?)"
+        " ORDER BY run_id, step_id, started_at",
+        (last_runs,),
+    ).fetchall()
+    seen: Dict[str, set] = {}
+    flaky: Dict[str, set] = {}
+    failed_on: Dict[tuple, Optional[str]] = {}  # (run, step) -> inputs_key of the last failure
+    for run_id, step_id, rc, patched, inputs_key in rows:
+        key = (run_id, step_id)
+        seen.setdefault(step_id, set()).add(run_id)
+        if patched:
+            failed_on.pop(key, None)
+        if rc != 0:
+            failed_on[key] = inputs_key
+        elif key in failed_on:
+            prev = failed_on.pop(key)
+            if prev is None or inputs_key is None or prev == inputs_key:
+                flaky.setdefault(step_id, set()).add(run_id)
+    return {
+        step_id: {"flaky_runs": len(runs), "runs": len(seen[step_id]), "rate": len(runs) / len(seen[step_id])}
+        for step_id, runs in flaky.items()
+    }
+
+
+def fix_stats(db: sqlite3.Connection, last_runs: int) -> Dict[str, float]:
+    runs = "(SELECT id FROM runs ORDER BY id DESC LIMIT ?)"
+    rows = db.execute(
+        f"SELECT run_id, step_id, started_at, outcome, latency_sec, cached FROM fixes"
+        f" WHERE run_id IN {runs} ORDER BY run_id, step_id, started_at",
+        (last_runs,),
+    ).fetchall()
+    attempts: Dict[tuple, List[tuple]] = {}
+    for run_id, step_id, started_at, rc in db.execute(
+        f"SELECT run_id, step_id, started_at, rc FROM step_attempts"
+        f" WHERE kind = 'step' AND run_id IN {runs} ORDER BY started_at",
+        (last_runs,),
+    ):
+        attempts.setdefault((run_id, step_id), []).append((started_at, rc))
+
+    ok = 0
+    for idx, (run_id, step_id, started_at, outcome, _, _) in enumerate(rows):
+        if outcome == "validated":
+            ok += 1
+            continue
+        if outcome != "applied":
+            continue
+        nxt = rows[idx + 1] if idx + 1 < len(rows) else None
+        until = nxt[2] if nxt and nxt[:2] == (run_id, step_id) else float("inf")
+        after = [rc for at, rc in attempts.get((run_id, step_id), []) if started_at < at < until]
+        if after and after[0] == 0:
+            ok += 1
+    lat = sorted(r[4] for r in rows if not r[5])
+    return {
+        "requests": len(rows),
+        "applied": sum(1 for r in rows if r[3] in FIX_APPLIED),
+        "success_rate": ok / len(rows) if rows else 0.0,
+        "cached": sum(1 for r in rows if r[5]),
+        "latency_p50": _percentile(lat, 50),
+        "latency_p95": _percentile(lat, 95),
+    }
+
+
+def report(path: Path, last_runs: int = 100) -> str:
+    db = sqlite3.connect(str(path))
+    try:
+        lines = [f"Run history: {path} (last {last_runs} runs)", "", "Step time (uncached):"]
+        timings = step_timings(db, last_runs)
+        for step_id, t in sorted(timings.items(), key=lambda kv: -kv[1]["p95"]):
+            lines.append(f"  {step_id:<20} n={t['n']:<4} p50={t['p50']:8.1f}s  p95={t['p95']:8.1f}s")
+        lines += ["", "Flakiest steps (failed then passed on identical inputs):"]
+        flaky = flaky_steps(db, last_runs)
+        if not flaky:
+            lines.append("  none")
+        for step_id, f in sorted(flaky.items(), key=lambda kv: -kv[1]["rate"]):
+            lines.append(f"  {step_id:<20} {f['flaky_runs']}/{f['runs']} runs ({f['rate']:.0%})")
+        fx = fix_stats(db, last_runs)
+        lines += [
+            "",
+            f"Codex fixes: {fx['requests']} requests, {fx['applied']} applied, "
+            f"{fx['success_rate']:.0%} turned the step green, "
+            f"{fx['cached']} from cache, latency p50={fx['latency_p50']:.1f}s p95={fx['latency_p95']:.1f}s",
+        ]
+        return "\n".join(lines)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Report on pipelines.py run history")
+    p.add_argument("--runs-dir", default="runs", help="Directory holding history.sqlite")
+    p.add_argument("--last", type=int, default=100, help="Only consider the most recent N runs")
+    args = p.parse_args()
+    path = Path(args.runs_dir) / "history.sqlite"
+    if not path.exists():
+        raise SystemExit(f"No run history at {path}")
+    print(report(path, args.last))
+
+
+if __name__ == "__main__":
+    main()
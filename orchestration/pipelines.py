@@ -1,17 +1,33 @@
 import argparse
 import json
 import os
+import random
+import shutil
+import signal
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from dataclasses import dataclass
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import yaml
 
-from orchestration.codex_mcp import propose_fix, apply_patch
+from orchestration.codex_mcp import default_cache, default_runner, propose_fix, apply_patch
+from orchestration.files_hint import files_hint
+from orchestration.fix_cache import repo_tree_hash
+from orchestration.history import RunHistory
+from orchestration.revalidate import narrow_command
+from orchestration.step_cache import StepCache
+from orchestration.summarize import CHARS_PER_TOKEN, summarize
+from orchestration.workers import SERVER_KINDS, WorkerPool, WorkerUnavailable, tee_lines
+from runner import CodexRunner
+from snapshot import WorkspaceSnapshot
 
 
 @dataclass
@@ -20,27 +36,199 @@ class Step:
     desc: str
     command: str
     transient: bool = False  # optional: retry with backoff on failure
+    needs: List[str] = field(default_factory=list)  # step ids that must pass first
+    inputs: List[str] = field(default_factory=list)  # globs; unchanged inputs → step is skipped
+    narrow: Optional[str] = None  # quick post-patch check; "{files}" → touched files
+    server: Optional[Dict] = None  # warm tool server, see workers.py
 
 
-def run_local(command: str, cwd: Path) -> Dict[str, str]:
-    proc = subprocess.run(
+# How much of a step's output is kept in memory for failure summaries; the
+# full output only ever goes to the console and the per-attempt log file.
+TAIL_CHARS = 64 * 1024
+
+
+def run_local(
+    command: str,
+    cwd: Path,
+    log_path: Optional[Path] = None,
+    on_line: Optional[Callable[[str], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> Dict[str, str]:
+    """Run command, streaming each output line to on_line and log_path as it
+    arrives. Returns {"output": <last TAIL_CHARS of output>, "rc": ...}.
+    Setting `stop` kills the command's whole process group."""
+    proc = subprocess.Popen(
         ["bash", "-lc", command],
         cwd=str(cwd),
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         env=os.environ.copy(),
         text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=stop is not None,
     )
-    return {"output": proc.stdout, "rc": str(proc.returncode)}
+    if stop is not None:
+        threading.Thread(target=_kill_on_stop, args=(proc, stop), daemon=True).start()
+    try:
+        output = tee_lines(proc.stdout, log_path, on_line, TAIL_CHARS)
+    finally:
+        rc = proc.wait()
+    return {"output": output, "rc": str(rc)}
 
 
-def summarize_failure(step: Step, output: str) -> str:
-    head = output[-4000:]
-    return (
-        f"Step '{step.id}' failed: {step.desc}\n"
-        f"Command: {step.command}\n"
-        f"Last output (tail):\n{head}\n"
-    )
+def _kill_on_stop(proc: subprocess.Popen, stop: threading.Event) -> None:
+    while proc.poll() is None:
+        if stop.wait(0.2):
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            return
+
+
+# Extra instructions that steer parallel candidates toward different patches.
+FIX_VARIANTS = [
+    "",
+    "Prefer the smallest possible change, even if it is a narrow fix.",
+    "Fix the root cause in the code under test; only change tests if they are wrong.",
+    "Consider configuration, imports and dependency declarations as the cause.",
+    "Rewrite the smallest enclosing function cleanly if a local patch is awkward.",
+]
+
+
+def forget_fix(codex: Dict[str, Any]) -> None:
+    """Drop a proposal that failed to apply from the fix cache, so the next
+    run asks Codex again instead of replaying it until the entry expires."""
+    if codex.get("cache_key"):
+        default_cache().delete(codex["cache_key"])
+
+
+# Docker label shared by the Codex containers of one speculate_fix call.
+SPECULATE_LABEL = "codex.speculate"
+
+
+def speculate_fix(
+    step: Step,
+    repo: Path,
+    fail_summary: str,
+    candidates: int,
+    out: Callable[[str], None],
+    bypass_cache: bool = False,
+    failure_output: str = "",
+    files: str = "",
+    runner: Optional[CodexRunner] = None,
+) -> Optional[str]:
+    """Ask for several candidate patches at once and return the first one that
+    makes the step pass in an isolated snapshot of the repo, or None.
+
+    Each candidate is validated in its own WorkspaceSnapshot, so the real
+    checkout is untouched until a winner is chosen. As soon as one passes,
+    the losing candidates' validation runs are stopped and their in-flight
+    Codex containers (labelled per speculation) are killed. Each candidate
+    gets its own FIX_VARIANTS steering, so at most len(FIX_VARIANTS) are asked.
+    """
+    runner = runner or default_runner()
+    candidates = min(candidates, len(FIX_VARIANTS))
+    won = threading.Event()
+    labels = {SPECULATE_LABEL: uuid.uuid4().hex}
+
+    def _candidate(idx: int) -> Optional[str]:
+        variant = FIX_VARIANTS[idx]
+        codex = propose_fix(
+            repo_path=str(repo),
+            failure_summary=fail_summary,
+            files_hint=files,
+            bypass_cache=bypass_cache,
+            variant=variant,
+            labels=labels,
+            runner=runner,
+        )
+        diff = codex["logs"]
+        if won.is_set() or codex["exit_code"] != 0 or not diff.strip().startswith("diff"):
+            return None
+        with WorkspaceSnapshot(str(repo)) as snap:
+            if apply_patch(snap.path, diff) != 0:
+                forget_fix(codex)
+                out(f"  candidate {idx + 1}: patch does not apply")
+                return None
+            quick = narrow_command(step.command, Path(snap.path), diff, failure_output, step.narrow)
+            if quick and run_local(quick, cwd=Path(snap.path), stop=won)["rc"] != "0":
+                if not won.is_set():
+                    out(f"  candidate {idx + 1}: quick check failed")
+                return None
+            res = run_local(step.command, cwd=Path(snap.path), stop=won)
+        if won.is_set():
+            return None
+        out(f"  candidate {idx + 1}: step rc={res['rc']}")
+        return diff if res["rc"] == "0" else None
+
+    out(f"-- Asking Codex for {candidates} candidate fixes in parallel --")
+    pool = ThreadPoolExecutor(max_workers=candidates)
+    try:
+        futures = [pool.submit(_candidate, i) for i in range(candidates)]
+        for fut in as_completed(futures):
+            try:
+                diff = fut.result()
+            except Exception as e:
+                out(f"  candidate failed: {e}")
+                continue
+            if diff is not None:
+                won.set()
+                return diff
+        return None
+    finally:
+        won.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        runner.kill_labelled(labels)
+
+
+def retry_delay(base: float, attempt: int, cap: float) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random, so
+    retries from concurrent steps or runs do not line up."""
+    ceiling = min(cap, base ** attempt)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def summarize_failure(
+    step: Step,
+    output: str,
+    repo: Optional[Path] = None,
+    log_path: Optional[Path] = None,
+    budget_tokens: int = 1500,
+) -> str:
+    """Structured errors (with source snippets) from the full attempt log when
+    the output is recognised; otherwise the tail that fits the budget."""
+    header = f"Step '{step.id}' failed: {step.desc}\nCommand: {step.command}\n"
+    errors = None
+    if log_path is not None and log_path.exists():
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            errors = summarize(f, repo, budget_tokens)
+    elif output:
+        errors = summarize(output.splitlines(), repo, budget_tokens)
+    if errors:
+        return header + f"Errors (most relevant first):\n{errors}\n"
+    head = output[-budget_tokens * CHARS_PER_TOKEN:]
+    return header + f"Last output (tail):\n{head}\n"
+
+
+def failure_files_hint(repo: Path, output: str, log_path: Optional[Path], index_path: Path) -> str:
+    """files_hint for propose_fix from the full attempt log (or the output tail)."""
+    try:
+        if log_path is not None and log_path.exists():
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                return files_hint(repo, f, index_path)
+        return files_hint(repo, output.splitlines(), index_path)
+    except OSError:
+        return ""
+
+
+def step_spec(step: Step) -> str:
+    """What the step runs, for its input cache key: the command plus the
+    server config, whose args are what actually run when servers are used."""
+    if not step.server:
+        return step.command
+    return step.command + "\0" + json.dumps(step.server, sort_keys=True)
 
 
 def persist(run_dir: Path, step_id: str, suffix: str, content: str) -> None:
@@ -53,12 +241,113 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--chain", default="orchestration/chains/python_quality.yaml")
     p.add_argument("--repo", default=os.getcwd())
     p.add_argument("--dry-run", action="store_true", help="Only ask Codex for diff; do not apply")
-    p.add_argument("--max-attempts", type=int, default=3, help="Retries for transient steps")
-    p.add_argument("--backoff", type=float, default=2.0, help="Base backoff seconds (exponential)")
+    p.add_argument("--max-attempts", type=int, default=3, help="Retries for transient and known-flaky steps")
+    p.add_argument("--backoff", type=float, default=2.0, help="Base backoff seconds (exponential, jittered)")
+    p.add_argument("--backoff-cap", type=float, default=60.0, help="Upper bound for a single backoff sleep")
+    p.add_argument("--flaky-window", type=int, default=50,
+                   help="Recent runs searched for flakes; 0 disables learned retries")
     p.add_argument("--runs-dir", default="runs", help="Directory to persist artifacts")
+    p.add_argument("--no-fix-cache", action="store_true", help="Always ask Codex; ignore cached proposals")
+    p.add_argument("-j", "--jobs", type=int, default=1, help="Max steps to run concurrently")
+    p.add_argument("--no-cache", action="store_true", help="Re-run steps even if their inputs are unchanged")
+    p.add_argument("--no-servers", action="store_true",
+                   help="Ignore step servers and always run each step's command in a fresh shell")
+    p.add_argument("--summary-budget", type=int, default=1500,
+                   help="Approximate token budget for the failure summary sent to Codex")
+    p.add_argument("--candidates", type=int, default=1,
+                   help="Request N fix proposals in parallel and apply the first that turns the step green "
+                        f"(at most {len(FIX_VARIANTS)}, one per steering variant)")
     return p.parse_args()
 
 
+def load_steps(cfg: Dict) -> List[Step]:
+    """Build steps from chain config and validate the dependency graph.
+
+    Chains where no step declares `needs` keep the original strictly linear
+    behaviour: each step implicitly needs the one before it.
+    """
+    raw = cfg.get("steps", [])
+    linear = not any("needs" in s for s in raw)
+    steps: List[Step] = []
+    for s in raw:
+        needs = s.get("needs") or []
+        if isinstance(needs, str):
+            needs = [needs]
+        if linear and steps:
+            needs = [steps[-1].id]
+        steps.append(Step(
+            id=s["id"],
+            desc=s.get("desc", s["id"]),
+            command=s["command"],
+            transient=bool(s.get("transient", False)),
+            needs=list(needs),
+            inputs=list(s.get("inputs") or []),
+            narrow=s.get("narrow"),
+            server=s.get("server"),
+        ))
+
+    ids = [s.id for s in steps]
+    if len(set(ids)) != len(ids):
+        raise ValueError("duplicate step ids in chain")
+    for s in steps:
+        if s.server is not None and (not isinstance(s.server, dict) or s.server.get("kind") not in SERVER_KINDS):
+            raise ValueError(f"step '{s.id}' has an invalid server (kinds: {', '.join(SERVER_KINDS)})")
+        unknown = [n for n in s.needs if n not in ids]
+        if unknown:
+            raise ValueError(f"step '{s.id}' needs unknown step(s): {', '.join(unknown)}")
+    # Reject cycles up front rather than deadlocking the scheduler.
+    state: Dict[str, int] = {}
+    by_id = {s.id: s for s in steps}
+
+    def _visit(sid: str) -> None:
+        if state.get(sid) == 1:
+            raise ValueError(f"dependency cycle through step '{sid}'")
+        if state.get(sid) == 2:
+            return
+        state[sid] = 1
+        for n in by_id[sid].needs:
+            _visit(n)
+        state[sid] = 2
+
+    for sid in ids:
+        _visit(sid)
+    return steps
+
+
+def run_dag(steps: List[Step], jobs: int, run_step: Callable[[Step], int]) -> Dict[str, int]:
+    """Run steps as soon as their `needs` have passed, up to `jobs` at a time.
+
+    Returns {step_id: rc}. A failed step only cancels its downstream steps
+    (recorded with rc -1); independent branches keep running. Ready steps
+    are started in chain-file order.
+    """
+    results: Dict[str, int] = {}
+    running: Dict[Future, Step] = {}
+    pending = list(steps)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for step in list(pending):
+                if any(results.get(n, 0) != 0 for n in step.needs if n in results):
+                    results[step.id] = -1
+                    pending.remove(step)
+                    blocked = [n for n in step.needs if results.get(n) not in (None, 0)]
+                    print(f"\n== {step.id}: skipped (upstream failed: {', '.join(blocked)}) ==")
+                elif len(running) < max(1, jobs) and all(results.get(n) == 0 for n in step.needs):
+                    running[pool.submit(run_step, step)] = step
+                    pending.remove(step)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                step = running.pop(fut)
+                try:
+                    results[step.id] = fut.result()
+                except Exception as e:  # keep other branches alive
+                    print(f"step '{step.id}' crashed: {e}", file=sys.stderr)
+                    results[step.id] = 1
+    return results
+
+
 def main():
     args = parse_args()
     repo = Path(args.repo)
@@ -74,67 +363,221 @@ def main():
     with open(chain_file, "r", encoding="utf-8") as f:
         cfg = yaml.safe_load(f)
 
-    steps: List[Step] = []
-    for s in cfg.get("steps", []):
-        steps.append(Step(
-            id=s["id"],
-            desc=s.get("desc", s["id"]),
-            command=s["command"],
-            transient=bool(s.get("transient", False)),
-        ))
+    try:
+        steps = load_steps(cfg)
+    except ValueError as e:
+        print(f"Invalid chain {chain_file}: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    order = {step.id: idx for idx, step in enumerate(steps, 1)}
+    # Shared across runs (not per timestamp) so a green run can be reused later.
+    step_cache = StepCache(runs_root / ".step-cache")
+    history = RunHistory(runs_root / "history.sqlite")
+    workers = WorkerPool(runs_root / ".workers", repo)
+    run_id = history.start_run(run_stamp, str(chain_file), str(repo))
+    print_lock = threading.Lock()
+    apply_lock = threading.Lock()  # concurrent steps must not patch the repo at once
 
-    for idx, step in enumerate(steps, 1):
-        print(f"\n== [{idx}/{len(steps)}] {step.id}: {step.desc} ==")
+    def run_step(step: Step) -> int:
+        # With --jobs > 1 a step's console output is spooled to a temp file and
+        # printed as one block when it finishes, so concurrent steps do not
+        # interleave and memory stays flat however chatty the step is.
+        if args.jobs <= 1:
+            return _run_step(step, lambda text="": print(text, flush=True))
+        with tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace") as spool:
+            try:
+                return _run_step(step, lambda text="": spool.write(text + "\n"))
+            finally:
+                spool.seek(0)
+                with print_lock:
+                    shutil.copyfileobj(spool, sys.stdout)
+                    sys.stdout.flush()
+
+    def execute(step: Step, log_path: Path, out: Callable[[str], None]) -> Dict[str, str]:
+        if step.server and not args.no_servers:
+            try:
+                return workers.run(step.server, log_path, out, TAIL_CHARS)
+            except WorkerUnavailable as e:
+                out(f"(server {step.server.get('kind')} unavailable: {e}; running command instead)")
+        return run_local(step.command, cwd=repo, log_path=log_path, on_line=out)
+
+    def _run_step(step: Step, out: Callable[[str], None]) -> int:
+        out(f"\n== [{order[step.id]}/{len(steps)}] {step.id}: {step.desc} ==")
+
+        # Steps seen to fail and then pass on identical inputs in recent runs
+        # get plain retries before anyone pays for a Codex call.
+        flaky = history.flakiness(step.id, args.flaky_window) if args.flaky_window > 0 else {}
+        retryable = step.transient or bool(flaky)
+        if flaky and not step.transient:
+            out(f"(known flaky: failed then passed on identical inputs in "
+                f"{flaky['flaky_runs']}/{flaky['runs']} recent runs)")
 
         attempt = 1
+        patched = False  # a patch was applied since the last recorded attempt
+        quick_failure: Optional[Dict[str, str]] = None  # failed post-patch quick check
         while True:
-            res = run_local(step.command, cwd=repo)
+            cache_key = memo = None
+            if quick_failure is not None:
+                # The narrow check already showed the patch is not enough;
+                # go straight back to Codex instead of running the full step.
+                res, quick_failure = quick_failure, None
+                from_quick = True
+            else:
+                from_quick = False
+                started = time.time()
+                inputs_key = None
+                if step.inputs:
+                    cache_key, memo = step_cache.key(step.id, step_spec(step), repo, step.inputs)
+                    if not args.no_cache and step_cache.last_green(step.id) == cache_key:
+                        out("cached: inputs unchanged since last green run, skipping")
+                        persist(run_dir, step.id, "cached", cache_key)
+                        history.record_attempt(run_id, step.id, attempt, started, 0, cached=True,
+                                               inputs_key=cache_key)
+                        return 0
+                    inputs_key = cache_key
+                else:
+                    # No declared inputs: "identical inputs" means an identical working tree.
+                    inputs_key = repo_tree_hash(str(repo))
+
+                # stream for user visibility; full output goes straight to the attempt log
+                log_path = run_dir / f"{step.id}.attempt{attempt}.log"
+                res = execute(step, log_path, out)
+                res["log"] = str(log_path)
+                history.record_attempt(run_id, step.id, attempt, started, int(res["rc"]),
+                                       patched=patched, inputs_key=inputs_key)
+                patched = False
             rc = int(res["rc"])
-            print(res["output"])  # stream for user visibility
-            persist(run_dir, step.id + f".attempt{attempt}", "log", res["output"])
 
             if rc == 0:
-                break
+                if cache_key:
+                    step_cache.record(step.id, cache_key, memo)
+                return 0
 
-            # Retry transient steps
-            if step.transient and attempt < args.max_attempts:
-                sleep_s = args.backoff ** attempt
-                print(f"Transient failure, retrying in {sleep_s:.1f}s (attempt {attempt+1}/{args.max_attempts})")
+            # The same inputs passed before, so this failure is not caused by them.
+            if not retryable and not from_quick and inputs_key and history.passed_on(step.id, inputs_key):
+                out("(these exact inputs passed in an earlier run: treating the failure as flaky)")
+                retryable = True
+
+            # Retry transient and known-flaky steps
+            if retryable and not from_quick and attempt < args.max_attempts:
+                sleep_s = retry_delay(args.backoff, attempt, args.backoff_cap)
+                kind = "Transient" if step.transient else "Flaky"
+                out(f"{kind} failure, retrying in {sleep_s:.1f}s (attempt {attempt+1}/{args.max_attempts})")
                 time.sleep(sleep_s)
                 attempt += 1
                 continue
 
             # Non-transient or retries exhausted → ask Codex for patch
-            fail_summary = summarize_failure(step, res["output"])
-            print("-- Failure summary --\n" + fail_summary)
+            log_path = Path(res["log"]) if res.get("log") else None
+            fail_summary = summarize_failure(step, res["output"], repo, log_path, args.summary_budget)
+            out("-- Failure summary --\n" + fail_summary)
             persist(run_dir, step.id, "summary.txt", fail_summary)
+            hint = failure_files_hint(repo, res["output"], log_path, runs_root / ".hint-index.json")
+            if hint:
+                out("-- Files hint --\n" + hint)
+                persist(run_dir, step.id, "files_hint.txt", hint)
+
+            fix_started = time.time()
+            if args.candidates > 1 and not args.dry_run:
+                diff = speculate_fix(
+                    step, repo, fail_summary, args.candidates, out, args.no_fix_cache, res["output"], hint
+                )
+                if diff is None:
+                    history.record_fix(run_id, step.id, fix_started, "no_candidate")
+                    out("No candidate fix turned the step green. Aborting.")
+                    return 1
+                persist(run_dir, step.id, "codex.out", diff)
+                with apply_lock:
+                    apply_rc = apply_patch(str(repo), diff)
+                out(f"git apply rc={apply_rc}")
+                if apply_rc != 0:
+                    history.record_fix(run_id, step.id, fix_started, "apply_failed", exit_code=0)
+                    out("Validated patch no longer applies to the repo. Aborting.")
+                    return 1
+                history.record_fix(run_id, step.id, fix_started, "validated", exit_code=0)
+                persist(run_dir, step.id, "applied.diff", diff)
+                # Already validated in a snapshot; no need to re-run the step here.
+                out("-- Patch validated in isolation and applied --")
+                return 0
 
-            print("-- Asking Codex for a fix (diff) --")
-            codex = propose_fix(repo_path=str(repo), failure_summary=fail_summary)
+            out("-- Asking Codex for a fix (diff) --")
+            codex = propose_fix(
+                repo_path=str(repo),
+                failure_summary=fail_summary,
+                files_hint=hint,
+                on_output=lambda _ch, line: out(line),  # live proposal/error output
+                bypass_cache=args.no_fix_cache,
+            )
+            if codex["cached"]:
+                out("(cached proposal)")
             persist(run_dir, step.id, "codex.out", codex["logs"])
-            print(codex["logs"])  # show proposed diff or error
+
+            fix_ended = time.time()
+
+            def _record_fix(outcome: str) -> None:
+                if outcome in ("invalid", "apply_failed"):
+                    forget_fix(codex)
+                history.record_fix(run_id, step.id, fix_started, outcome, cached=codex["cached"],
+                                   exit_code=codex["exit_code"], ended_at=fix_ended)
 
             if codex["exit_code"] == 0 and codex["logs"].strip().startswith("diff"):
                 if args.dry_run:
-                    print("Dry-run mode: not applying diff. Aborting after printing proposal.")
-                    sys.exit(3)
-                print("-- Applying proposed diff --")
-                apply_rc = apply_patch(str(repo), codex["logs"])
-                print(f"git apply rc={apply_rc}")
+                    _record_fix("dry_run")
+                    out("Dry-run mode: not applying diff. Aborting after printing proposal.")
+                    return 3
+                out("-- Applying proposed diff --")
+                with apply_lock:
+                    apply_rc = apply_patch(str(repo), codex["logs"])
+                out(f"git apply rc={apply_rc}")
                 if apply_rc == 0:
+                    _record_fix("applied")
+                    patched = True
                     persist(run_dir, step.id, "applied.diff", codex["logs"])
-                    print("-- Re-running failed step after patch --")
+                    quick = narrow_command(step.command, repo, codex["logs"], res["output"], step.narrow)
+                    if quick:
+                        out(f"-- Quick check of the patch: {quick} --")
+                        quick_started = time.time()
+                        quick_log = run_dir / f"{step.id}.quick.log"
+                        checked = run_local(quick, cwd=repo, log_path=quick_log, on_line=out)
+                        checked["log"] = str(quick_log)
+                        history.record_attempt(run_id, step.id, attempt, quick_started, int(checked["rc"]),
+                                               kind="quick", patched=True)
+                        if checked["rc"] != "0":
+                            out("-- Quick check failed; asking for another fix --")
+                            quick_failure = checked
+                            attempt = 1
+                            continue
+                    out("-- Re-running failed step after patch --")
                     # loop continues; reset attempt for same step
                     attempt = 1
                     continue
                 else:
-                    print("Patch could not be applied. Aborting.")
-                    sys.exit(1)
+                    _record_fix("apply_failed")
+                    out("Patch could not be applied. Aborting.")
+                    return 1
             else:
-                print("Codex did not return a valid diff. Aborting.")
-                sys.exit(1)
+                _record_fix("invalid")
+                out("Codex did not return a valid diff. Aborting.")
+                return 1
+
+    try:
+        results = run_dag(steps, args.jobs, run_step)
+    finally:
+        workers.close()
+    failed = {sid: rc for sid, rc in results.items() if rc != 0}
+    if failed:
+        print("\nFailed or skipped steps: " + ", ".join(f"{sid} (rc={rc})" for sid, rc in failed.items()))
+        print(f"Artifacts in {run_dir}")
+        # Preserve the old exit codes: 3 only when every real failure was a dry-run stop.
+        exit_rc = 3 if all(rc in (3, -1) for rc in failed.values()) and 3 in failed.values() else 1
+        history.finish_run(run_id, exit_rc)
+        sys.exit(exit_rc)
+    history.finish_run(run_id, 0)
 
     print(f"\nAll steps passed. Artifacts in {run_dir}")
+    stats = default_cache().stats()
+    if stats["hits"] or stats["misses"]:
+        print(f"Fix cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""Warm pytest server used by orchestration/workers.py.
+
+Imports the --preload modules once, then reads one JSON request per line on
+stdin ({"args": [...]}) and forks a child per request that runs
+pytest.main(args) in the current directory. Child output goes straight to
+this process's stdout; when the child exits a DONE marker line carrying its
+exit code is written. EOF on stdin shuts the worker down.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+DONE_MARKER = "\x1e__pytest_worker_done__ "
+
+
+def _preload(modules: str) -> None:
+    for name in filter(None, modules.split(",")):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"pytest worker: could not preload {name}: {e}", file=sys.stderr)
+
+
+def _run_child(args: list) -> None:
+    rc = 1
+    try:
+        import pytest
+
+        rc = int(pytest.main(args))
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        print(f"pytest worker: {e!r}", file=sys.stderr)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(rc)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--preload", default="pytest")
+    _preload(p.parse_args().preload)
+    sys.stdout.flush()
+
+    for raw in sys.stdin:
+        try:
+            args = [str(a) for a in json.loads(raw).get("args", [])]
+        except ValueError:
+            continue
+        pid = os.fork()
+        if pid == 0:
+            _run_child(args)
+        _, status = os.waitpid(pid, 0)
+        rc = os.waitstatus_to_exitcode(status)
+        sys.stdout.write(DONE_MARKER + json.dumps({"rc": rc}) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
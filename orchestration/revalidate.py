@@ -0,0 +1,80 @@
+import re
+import shlex
+from pathlib import Path
+from typing import List, Optional
+
+from orchestration.summarize import ANSI
+
+# Narrow re-validation of an applied patch: derive a quick check that covers
+# only what the patch touched (and what was failing), so an obviously bad
+# patch is rejected without re-running the whole step.
+
+_DIFF_FILE = re.compile(r"^\+\+\+ b/(.+?)\s*$", re.M)
+_PYTEST_NODE = re.compile(r"^(?:FAILED|ERROR) (\S+?\.py(?:::\S+)?)", re.M)
+_PATH_LINE = re.compile(r"^([\w./-]+\.pyi?):\d+", re.M)
+
+
+def touched_files(diff_text: str) -> List[str]:
+    """Repo-relative paths a unified diff adds or modifies."""
+    seen: List[str] = []
+    for path in _DIFF_FILE.findall(diff_text):
+        if path != "/dev/null" and path not in seen:
+            seen.append(path)
+    return seen
+
+
+def failed_pytest_nodes(output: str) -> List[str]:
+    """Node ids from pytest's short test summary (FAILED/ERROR lines).
+
+    Colour codes (--color=yes) are stripped first.
+    """
+    nodes: List[str] = []
+    for node in _PYTEST_NODE.findall(ANSI.sub("", output)):
+        if node not in nodes:
+            nodes.append(node)
+    return nodes
+
+
+def _is_test_file(path: str) -> bool:
+    name = Path(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def narrow_command(
+    command: str,
+    repo: Path,
+    diff_text: str,
+    failure_output: str,
+    template: Optional[str] = None,
+) -> Optional[str]:
+    """Build a quick check for the patch, or None if nothing narrower applies.
+
+    A step's own `narrow` template wins; `{files}` expands to the touched
+    files. Otherwise pytest, mypy, ruff and black invocations in the step
+    command are narrowed to the failing tests / touched Python files.
+    """
+    touched = [f for f in touched_files(diff_text) if (repo / f).exists()]
+    py = [f for f in touched if f.endswith((".py", ".pyi"))]
+    # Files the failure pointed at (mypy/ruff "path:line:" records) still need checking.
+    for f in _PATH_LINE.findall(ANSI.sub("", failure_output)):
+        if f not in py and (repo / f).is_file():
+            py.append(f)
+
+    if template:
+        if not touched:
+            return None
+        return template.replace("{files}", " ".join(shlex.quote(f) for f in touched))
+
+    checks: List[str] = []
+    if py and re.search(r"\bruff\b", command):
+        checks.append("ruff check " + " ".join(shlex.quote(f) for f in py))
+    if py and re.search(r"\bblack\b", command):
+        checks.append("black --check " + " ".join(shlex.quote(f) for f in py))
+    if py and re.search(r"\bmypy\b", command):
+        checks.append("mypy " + " ".join(shlex.quote(f) for f in py))
+    if re.search(r"\bpytest\b", command):
+        targets = failed_pytest_nodes(failure_output)
+        targets += [f for f in touched if _is_test_file(f) and f not in targets]
+        if targets:
+            checks.append("pytest -q " + " ".join(shlex.quote(t) for t in targets))
+    return " && ".join(checks) or None
@@ -0,0 +1,85 @@
+import fnmatch
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from orchestration.fsutil import write_atomic
+
+# Records, per chain step, the input hash of its last green run so unchanged
+# steps can be skipped. One JSON file per step id keeps concurrent steps from
+# racing on a shared file. Each record also carries a (size, mtime_ns) → sha256
+# memo per input file so unchanged files are not re-read on the next run.
+
+SKIP_DIRS = {".git", "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".venv", "node_modules"}
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _matches(rel: str, pattern: str) -> bool:
+    # fnmatch's "*" also crosses "/", which errs on the side of including a
+    # file — the safe direction for cache invalidation.
+    if fnmatch.fnmatchcase(rel, pattern):
+        return True
+    return pattern.startswith("**/") and fnmatch.fnmatchcase(rel, pattern[3:])
+
+
+def match_inputs(repo: Path, globs: List[str]) -> List[Path]:
+    """Files under repo matching any glob (``**`` supported), tool caches excluded."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(repo):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for fn in filenames:
+            path = Path(dirpath) / fn
+            rel = path.relative_to(repo).as_posix()
+            if any(_matches(rel, g) for g in globs):
+                found.append(path)
+    return sorted(found)
+
+
+class StepCache:
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, step_id: str) -> Path:
+        return self.root / f"{step_id}.json"
+
+    def _load(self, step_id: str) -> Dict:
+        try:
+            return json.loads(self._path(step_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def key(self, step_id: str, command: str, repo: Path, globs: List[str]) -> Tuple[str, Dict[str, list]]:
+        """Hash of the command plus every matching file's path and content.
+
+        Returns (key, file memo) — pass the memo back to record().
+        """
+        old_memo = self._load(step_id).get("files", {})
+        memo: Dict[str, list] = {}
+        h = hashlib.sha256(command.encode("utf-8") + b"\0")
+        for path in match_inputs(repo, globs):
+            rel = path.relative_to(repo).as_posix()
+            st = path.stat()
+            prev = old_memo.get(rel)
+            if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                digest = prev[2]
+            else:
+                digest = _sha256_file(path)
+            memo[rel] = [st.st_size, st.st_mtime_ns, digest]
+            h.update(f"{rel}\0{digest}\0".encode("utf-8"))
+        return h.hexdigest(), memo
+
+    def last_green(self, step_id: str) -> Optional[str]:
+        return self._load(step_id).get("key")
+
+    def record(self, step_id: str, key: str, memo: Dict[str, list]) -> None:
+        write_atomic(self._path(step_id), json.dumps({"key": key, "at": time.time(), "files": memo}))
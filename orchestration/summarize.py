@@ -0,0 +1,169 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Failure summarization for Codex prompts: parse pytest, mypy, ruff and
+# generic Python traceback output into error records, dedupe and rank them,
+# and pack the most relevant ones plus the source lines they point at into a
+# token budget. Parsing is line-by-line, so a full step log can be fed in
+# without loading it into memory.
+
+# Rough chars-per-token ratio for budgeting; exact tokenization is not needed.
+CHARS_PER_TOKEN = 4
+MAX_RECORDS = 500  # keep memory bounded on pathological output
+
+# Colour and cursor escapes; tools run with --color=yes emit them mid-line.
+ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_MYPY = re.compile(r"^(?P<path>[^\s:]+\.pyi?):(?P<line>\d+)(?::\d+)?: error: (?P<msg>.*?)(?:  \[(?P<code>[\w-]+)\])?$")
+_RUFF = re.compile(r"^(?P<path>[^\s:]+):(?P<line>\d+):\d+: (?P<code>[A-Z]+\d+) (?P<msg>.*)$")
+_PYTEST_FAILED = re.compile(r"^(?P<kind>FAILED|ERROR) (?P<node>\S+?)(?: - (?P<msg>.*))?$")
+_PYTEST_LOC = re.compile(r"^(?P<path>[^\s:]+\.py):(?P<line>\d+): (?P<msg>\w*(?:Error|Exception|Exit)\b.*)$")
+_TB_FRAME = re.compile(r'^\s*File "(?P<path>[^"]+)", line (?P<line>\d+)')
+_TB_EXC = re.compile(r"^(?P<exc>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt))(?::\s*(?P<msg>.*))?$")
+
+# Higher is more important: test failures and crashes carry the most signal,
+# type errors next, lint findings last.
+_TOOL_WEIGHT = {"pytest": 40, "traceback": 35, "mypy": 25, "ruff": 10}
+
+
+@dataclass
+class ErrorRecord:
+    tool: str
+    message: str
+    path: Optional[str] = None
+    line: Optional[int] = None
+    code: Optional[str] = None
+    first_seen: int = 0  # output line number of the first occurrence
+    count: int = 1
+
+    def key(self) -> Tuple:
+        return (self.tool, self.path, self.line, self.code, self.message)
+
+    def render(self) -> str:
+        loc = f"{self.path}:{self.line}: " if self.path and self.line else ""
+        code = f" [{self.code}]" if self.code else ""
+        times = f" (x{self.count})" if self.count > 1 else ""
+        return f"[{self.tool}] {loc}{self.message}{code}{times}"
+
+
+def extract_records(lines: Iterable[str]) -> List[ErrorRecord]:
+    """Parse tool output into deduplicated error records, in first-seen order."""
+    records: Dict[Tuple, ErrorRecord] = {}
+    last_frame: Optional[Tuple[str, int]] = None  # innermost traceback frame so far
+
+    def _add(rec: ErrorRecord) -> None:
+        existing = records.get(rec.key())
+        if existing is not None:
+            existing.count += 1
+        elif len(records) < MAX_RECORDS:
+            records[rec.key()] = rec
+
+    for idx, raw in enumerate(lines):
+        line = ANSI.sub("", raw.rstrip("\n"))
+        m = _MYPY.match(line)
+        if m:
+            _add(ErrorRecord("mypy", m["msg"], m["path"], int(m["line"]), m["code"], idx))
+            continue
+        m = _RUFF.match(line)
+        if m:
+            _add(ErrorRecord("ruff", m["msg"], m["path"], int(m["line"]), m["code"], idx))
+            continue
+        m = _PYTEST_FAILED.match(line)
+        if m:
+            node = m["node"]
+            _add(ErrorRecord("pytest", f"{m['kind']} {node}" + (f": {m['msg']}" if m["msg"] else ""),
+                             node.split("::", 1)[0], None, None, idx))
+            continue
+        m = _PYTEST_LOC.match(line)
+        if m:
+            _add(ErrorRecord("pytest", m["msg"], m["path"], int(m["line"]), None, idx))
+            continue
+        m = _TB_FRAME.match(line)
+        if m:
+            last_frame = (m["path"], int(m["line"]))
+            continue
+        m = _TB_EXC.match(line.strip()) if last_frame else None
+        if m:
+            msg = m["exc"] + (f": {m['msg']}" if m["msg"] else "")
+            _add(ErrorRecord("traceback", msg, last_frame[0], last_frame[1], None, idx))
+            last_frame = None
+    return list(records.values())
+
+
+def _in_repo(path: Optional[str], repo: Optional[Path]) -> Optional[Path]:
+    if not path or repo is None:
+        return None
+    p = Path(path)
+    p = p if p.is_absolute() else repo / p
+    try:
+        p.resolve().relative_to(repo.resolve())
+    except ValueError:
+        return None  # site-packages and other third-party frames
+    return p if p.is_file() else None
+
+
+def rank(records: List[ErrorRecord], repo: Optional[Path] = None) -> List[ErrorRecord]:
+    """Most relevant first: tool weight, project files over third-party, the
+    earliest errors (usually the root cause), then repetition."""
+    total = max(1, max((r.first_seen for r in records), default=0))
+
+    def _score(r: ErrorRecord) -> float:
+        score = _TOOL_WEIGHT.get(r.tool, 0)
+        if _in_repo(r.path, repo) is not None:
+            score += 20
+        score += 15 * (1 - r.first_seen / total)
+        score += min(r.count, 5)
+        return score
+
+    return sorted(records, key=_score, reverse=True)
+
+
+def snippet(path: Path, line: int, context: int = 3) -> str:
+    start = max(1, line - context)
+    out = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for no, text in enumerate(f, 1):
+                if no < start:
+                    continue
+                if no > line + context:
+                    break
+                mark = ">" if no == line else " "
+                out.append(f"{mark}{no:5d} | {text.rstrip()}")
+    except OSError:
+        return ""
+    return "\n".join(out)
+
+
+def pack(records: List[ErrorRecord], repo: Optional[Path], budget_tokens: int) -> str:
+    """Render ranked records, each followed by its source snippet when it fits."""
+    budget = budget_tokens * CHARS_PER_TOKEN
+    parts: List[str] = []
+    used = 0
+    shown_snippets = set()
+    for rec in records:
+        text = rec.render()
+        if used + len(text) + 1 > budget:
+            break
+        parts.append(text)
+        used += len(text) + 1
+        src = _in_repo(rec.path, repo)
+        if src is not None and rec.line and (src, rec.line) not in shown_snippets:
+            snip = snippet(src, rec.line)
+            if snip and used + len(snip) + 1 <= budget:
+                parts.append(snip)
+                used += len(snip) + 1
+                shown_snippets.add((src, rec.line))
+    omitted = len(records) - sum(1 for p in parts if p.startswith("["))
+    if omitted > 0:
+        parts.append(f"... {omitted} more error(s) omitted")
+    return "\n".join(parts)
+
+
+def summarize(lines: Iterable[str], repo: Optional[Path], budget_tokens: int) -> Optional[str]:
+    """Packed summary of the errors in lines, or None if no parser recognised any."""
+    records = extract_records(lines)
+    if not records:
+        return None
+    return pack(rank(records, repo), repo, budget_tokens)
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from orchestration.files_hint import files_hint
+from orchestration.tests.test_revalidate import _chain_pytest_args, _failing_repo
+
+
+def test_coloured_pytest_location_is_ranked_as_failure_location(tmp_path):
+    (tmp_path / "repo").mkdir()
+    repo = _failing_repo(tmp_path / "repo")
+    proc = subprocess.run(
+        [sys.executable, "-m", "pytest", *_chain_pytest_args()],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+    )
+    assert "\x1b[" in proc.stdout
+    hint = files_hint(repo, proc.stdout.splitlines(), tmp_path / "index.json")
+    assert hint.splitlines()[0].startswith("- test_mod.py:5 (failure location")
@@ -0,0 +1,53 @@
+import sqlite3
+
+from orchestration.history import RunHistory, fix_stats, flaky_steps
+
+
+def _history(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite")
+    return history, history.start_run("stamp", "chain", "repo")
+
+
+def _flaky(tmp_path):
+    with sqlite3.connect(str(tmp_path / "history.sqlite")) as db:
+        return flaky_steps(db, 50)
+
+
+def test_fail_then_pass_on_same_inputs_is_flaky(tmp_path):
+    history, run = _history(tmp_path)
+    history.record_attempt(run, "tests", 1, 1.0, 1, inputs_key="k")
+    history.record_attempt(run, "tests", 2, 2.0, 0, inputs_key="k")
+    history.close()
+    assert _flaky(tmp_path) == {"tests": {"flaky_runs": 1, "runs": 1, "rate": 1.0}}
+
+
+def test_pass_after_patch_is_not_flaky(tmp_path):
+    history, run = _history(tmp_path)
+    history.record_attempt(run, "tests", 1, 1.0, 1, inputs_key="k")
+    history.record_attempt(run, "tests", 1, 2.0, 0, patched=True, inputs_key="k")
+    history.close()
+    assert _flaky(tmp_path) == {}
+
+
+def test_pass_on_changed_inputs_is_not_flaky(tmp_path):
+    history, run = _history(tmp_path)
+    history.record_attempt(run, "tests", 1, 1.0, 1, inputs_key="k1")
+    history.record_attempt(run, "tests", 2, 2.0, 0, inputs_key="k2")
+    history.close()
+    assert _flaky(tmp_path) == {}
+
+
+def test_applied_fix_counts_only_if_the_step_went_green(tmp_path):
+    history, run = _history(tmp_path)
+    history.record_attempt(run, "tests", 1, 1.0, 1)
+    history.record_fix(run, "tests", 2.0, "applied", ended_at=3.0)
+    history.record_attempt(run, "tests", 1, 4.0, 1, patched=True)
+    history.record_fix(run, "tests", 5.0, "applied", ended_at=6.0)
+    history.record_attempt(run, "tests", 1, 7.0, 0, patched=True)
+    history.record_fix(run, "lint", 8.0, "invalid", ended_at=9.0)
+    history.close()
+    with sqlite3.connect(str(tmp_path / "history.sqlite")) as db:
+        stats = fix_stats(db, 50)
+    assert stats["requests"] == 3
+    assert stats["applied"] == 2
+    assert stats["success_rate"] == 1 / 3
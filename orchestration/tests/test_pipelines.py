@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from orchestration.pipelines import load_steps, run_dag
+
+
+def _chain(*steps):
+    return {"steps": [{"id": sid, "command": "true", **extra} for sid, extra in steps]}
+
+
+def test_cycle_is_rejected():
+    cfg = _chain(("a", {"needs": ["c"]}), ("b", {"needs": ["a"]}), ("c", {"needs": ["b"]}))
+    with pytest.raises(ValueError, match="cycle"):
+        load_steps(cfg)
+
+
+def test_unknown_need_is_rejected():
+    with pytest.raises(ValueError, match="unknown step"):
+        load_steps(_chain(("a", {"needs": ["missing"]})))
+
+
+def test_chain_without_needs_runs_in_order():
+    steps = load_steps(_chain(("a", {}), ("b", {}), ("c", {})))
+    assert [s.needs for s in steps] == [[], ["a"], ["b"]]
+
+
+def test_failed_step_skips_only_its_downstream():
+    steps = load_steps(_chain(
+        ("lint", {"needs": []}),
+        ("types", {"needs": []}),
+        ("tests", {"needs": ["lint", "types"]}),
+        ("docs", {"needs": []}),
+        ("package", {"needs": ["docs"]}),
+    ))
+    ran = []
+    lock = threading.Lock()
+
+    def run_step(step):
+        with lock:
+            ran.append(step.id)
+        return 1 if step.id == "types" else 0
+
+    results = run_dag(steps, 2, run_step)
+    assert results == {"lint": 0, "types": 1, "tests": -1, "docs": 0, "package": 0}
+    assert "tests" not in ran
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+from orchestration.revalidate import failed_pytest_nodes, narrow_command
+
+CHAIN = Path(__file__).resolve().parents[1] / "chains" / "python_quality.yaml"
+
+
+def _chain_pytest_args() -> list:
+    """The `tests` step's pytest flags; --cov* is dropped when pytest-cov is missing."""
+    steps = yaml.safe_load(CHAIN.read_text(encoding="utf-8"))["steps"]
+    args = next(s for s in steps if s["id"] == "tests")["server"]["args"]
+    try:
+        import pytest_cov  # noqa: F401
+    except ImportError:
+        args = [a for a in args if not a.startswith("--cov")]
+    return args
+
+
+def _failing_repo(tmp_path: Path) -> Path:
+    (tmp_path / "mod.py").write_text("def add(a, b):\n    return a - b\n")
+    (tmp_path / "test_mod.py").write_text(
+        "from mod import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n\n\ndef test_ok():\n    assert True\n"
+    )
+    return tmp_path
+
+
+def _run_pytest(repo: Path) -> str:
+    proc = subprocess.run(
+        [sys.executable, "-m", "pytest", *_chain_pytest_args()],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 1, proc.stdout + proc.stderr
+    return proc.stdout
+
+
+def test_failed_nodes_found_in_coloured_output(tmp_path):
+    output = _run_pytest(_failing_repo(tmp_path))
+    assert "\x1b[" in output  # --color=yes from the chain is in effect
+    assert failed_pytest_nodes(output) == ["test_mod.py::test_add"]
+
+
+def test_source_only_patch_narrows_to_failing_test(tmp_path):
+    repo = _failing_repo(tmp_path)
+    output = _run_pytest(repo)
+    diff = "diff --git a/mod.py b/mod.py\n--- a/mod.py\n+++ b/mod.py\n@@ -2 +2 @@\n-    return a - b\n+    return a + b\n"
+    command = 'bash -lc "pytest -q --color=yes"'
+    assert narrow_command(command, repo, diff, output) == "pytest -q test_mod.py::test_add"
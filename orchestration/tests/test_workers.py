@@ -0,0 +1,24 @@
+import sys
+
+import pytest
+
+from orchestration.workers import WorkerPool, WorkerUnavailable, pytest_python
+
+
+def test_pytest_usage_error_falls_back_to_command(tmp_path):
+    (tmp_path / "test_ok.py").write_text("def test_ok():\n    assert True\n")
+    pool = WorkerPool(tmp_path / "state", tmp_path)
+    try:
+        server = {"kind": "pytest", "args": ["-q", "--no-such-option"], "python": sys.executable}
+        with pytest.raises(WorkerUnavailable, match="rc=4"):
+            pool.run(server, None, None, 10_000)
+        res = pool.run({**server, "args": ["-q"]}, None, None, 10_000)
+        assert res["rc"] == "0"
+    finally:
+        pool.close()
+
+
+def test_pytest_python_prefers_configured_interpreter(tmp_path):
+    assert pytest_python(tmp_path, sys.executable) == sys.executable
+    with pytest.raises(WorkerUnavailable):
+        pytest_python(tmp_path, "no-such-python-3.99")
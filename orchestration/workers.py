@@ -0,0 +1,212 @@
+import json
+import shutil
+import subprocess
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Long-lived tool servers for chain steps. A step that declares
+#   server: {kind: dmypy, args: ["."]}
+#   server: {kind: pytest, args: ["-q"], preload: ["pytest", "numpy"], python: ".venv/bin/python"}
+# is executed through a daemon that stays warm across steps, retries and
+# post-patch re-runs of one pipeline run, instead of a fresh `bash -lc`
+# login shell and interpreter each time.
+#
+#   dmypy   mypy's own daemon; only changed modules are re-checked.
+#   pytest  a Python process with third-party imports preloaded that forks
+#           one child per run (see pytest_worker.py). Only list modules that
+#           patches will not touch: the project's own code must be imported
+#           fresh by each child. It runs under `python` if given (relative
+#           to the repo or looked up on PATH), else the interpreter of the
+#           `pytest` found on PATH, i.e. the one the step's command would use.
+
+SERVER_KINDS = ("dmypy", "pytest")
+PYTEST_WORKER = Path(__file__).with_name("pytest_worker.py")
+DONE_MARKER = "\x1e__pytest_worker_done__ "
+DMYPY_ERROR = 2  # dmypy's exit code for client/daemon failures (1 = type errors)
+# pytest's exit codes for an internal error and a usage error (e.g. --cov
+# without pytest-cov in the worker's interpreter): no test result to fix.
+PYTEST_ERRORS = (3, 4)
+
+
+class WorkerUnavailable(RuntimeError):
+    """The requested server cannot be started; callers fall back to the step command."""
+
+
+def tee_lines(
+    lines: Iterable[str],
+    log_path: Optional[Path],
+    on_line: Optional[Callable[[str], None]],
+    tail_chars: int,
+) -> str:
+    """Send each line to on_line and log_path as it arrives; return the last tail_chars."""
+    tail: deque = deque()
+    tail_len = 0
+    log = None
+    if log_path is not None:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        log = open(log_path, "w", encoding="utf-8", errors="ignore")
+    try:
+        for line in lines:
+            if log is not None:
+                log.write(line)
+                log.flush()
+            if on_line is not None:
+                on_line(line.rstrip("\n"))
+            tail.append(line)
+            tail_len += len(line)
+            while tail_len > tail_chars and len(tail) > 1:
+                tail_len -= len(tail.popleft())
+    finally:
+        if log is not None:
+            log.close()
+    return "".join(tail)[-tail_chars:]
+
+
+def pytest_python(repo: Path, python: Optional[str] = None) -> str:
+    """Interpreter for the pytest worker: the configured one, else the one in
+    the shebang of the `pytest` script on PATH, else our own."""
+    if python:
+        local = repo / python
+        exe = str(local) if local.is_file() else shutil.which(python)
+        if exe is None:
+            raise WorkerUnavailable(f"python interpreter not found: {python}")
+        return exe
+    script = shutil.which("pytest")
+    if script is not None:
+        try:
+            with open(script, "rb") as f:
+                first = f.readline().decode("utf-8", errors="replace")
+        except OSError:
+            first = ""
+        if first.startswith("#!"):
+            parts = first[2:].split()
+            if parts and Path(parts[0]).name == "env" and len(parts) > 1:
+                parts = [shutil.which(parts[1]) or ""]
+            if parts and "python" in Path(parts[0]).name and Path(parts[0]).is_file():
+                return parts[0]
+    return sys.executable
+
+
+class PytestWorker:
+    def __init__(self, cwd: Path, preload: List[str], python: str = sys.executable) -> None:
+        self.proc = subprocess.Popen(
+            [python, "-u", str(PYTEST_WORKER), "--preload", ",".join(preload)],
+            cwd=str(cwd),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            bufsize=1,
+        )
+        self.lock = threading.Lock()  # one forked run at a time per worker
+        self.rc = 1
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, args: List[str]) -> Iterable[str]:
+        """Yield the run's output lines; self.rc holds its exit code afterwards."""
+        try:
+            self.proc.stdin.write(json.dumps({"args": args}) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerUnavailable(f"pytest worker is gone: {e}")
+        for line in self.proc.stdout:
+            idx = line.find(DONE_MARKER)
+            if idx < 0:
+                yield line
+                continue
+            if idx > 0:
+                yield line[:idx] + "\n"
+            self.rc = int(json.loads(line[idx + len(DONE_MARKER):])["rc"])
+            return
+        raise WorkerUnavailable("pytest worker exited")
+
+    def close(self) -> None:
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+
+
+class WorkerPool:
+    """Servers shared by all steps of one pipeline run; close() stops them."""
+
+    def __init__(self, state_dir: Path, repo: Path) -> None:
+        self.state_dir = Path(state_dir)
+        self.repo = repo
+        self._pytest: Dict[tuple, PytestWorker] = {}
+        self._dmypy_used = False
+        self._lock = threading.Lock()
+
+    def _dmypy(self) -> List[str]:
+        exe = shutil.which("dmypy")
+        if exe is None:
+            raise WorkerUnavailable("dmypy not found on PATH")
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        return [exe, "--status-file", str(self.state_dir / "dmypy.json")]
+
+    def run(
+        self,
+        server: Dict,
+        log_path: Optional[Path],
+        on_line: Optional[Callable[[str], None]],
+        tail_chars: int,
+    ) -> Dict[str, str]:
+        kind = server.get("kind")
+        args = [str(a) for a in server.get("args") or []]
+        if kind == "dmypy":
+            # `dmypy run` starts the daemon on first use and reuses it afterwards.
+            argv = self._dmypy() + ["run", "--", *args]
+            with self._lock:
+                self._dmypy_used = True
+            proc = subprocess.Popen(
+                argv, cwd=str(self.repo), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors="replace", bufsize=1,
+            )
+            try:
+                output = tee_lines(proc.stdout, log_path, on_line, tail_chars)
+            finally:
+                rc = proc.wait()
+            if rc == DMYPY_ERROR:
+                # Not a type-check result: the client or daemon itself failed.
+                raise WorkerUnavailable(f"dmypy failed (rc={rc}): {output[-500:].strip()}")
+            return {"output": output, "rc": str(rc)}
+        if kind == "pytest":
+            python = pytest_python(self.repo, server.get("python"))
+            worker = self._pytest_worker(python, server.get("preload") or ["pytest"])
+            with worker.lock:
+                output = tee_lines(worker.run(args), log_path, on_line, tail_chars)
+                rc = worker.rc
+            if rc in PYTEST_ERRORS:
+                raise WorkerUnavailable(f"pytest worker failed (rc={rc}): {output[-500:].strip()}")
+            return {"output": output, "rc": str(rc)}
+        raise WorkerUnavailable(f"unknown server kind: {kind}")
+
+    def _pytest_worker(self, python: str, preload: List[str]) -> PytestWorker:
+        key = (python, *preload)
+        with self._lock:
+            worker = self._pytest.get(key)
+            if worker is None or not worker.alive():
+                try:
+                    worker = PytestWorker(self.repo, list(preload), python)
+                except OSError as e:
+                    raise WorkerUnavailable(str(e))
+                self._pytest[key] = worker
+            return worker
+
+    def close(self) -> None:
+        for worker in self._pytest.values():
+            worker.close()
+        self._pytest.clear()
+        if self._dmypy_used:
+            try:
+                subprocess.run(self._dmypy() + ["stop"], stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, timeout=30)
+            except (WorkerUnavailable, OSError, subprocess.TimeoutExpired):
+                pass
@@ -1,10 +1,154 @@
+import atexit
+import codecs
 import json
 import os
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+import uuid
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import docker
-from docker.errors import APIError, NotFound
+from docker.errors import APIError, ImageNotFound, NotFound
+from docker.utils import parse_bytes, parse_repository_tag
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ReadTimeout
+
+from snapshot import WorkspaceSnapshot
+
+
+BATCH_LABEL = "codex.batch"
+
+@dataclass
+class JobStats:
+    """Resource usage and phase timings for one CodexRunner job.
+
+    Pass an instance as run(stats=...) to have it filled in. Phases of a fresh
+    container are create/start/run/logs/teardown; pooled jobs report
+    acquire/run/teardown only, since the container's counters are shared
+    with earlier jobs.
+    """
+
+    phases: Dict[str, float] = field(default_factory=dict)
+    wall_sec: float = 0.0
+    peak_memory_bytes: int = 0
+    cpu_time_ns: int = 0
+    throttled_time_ns: int = 0
+    throttled_periods: int = 0
+    peak_pids: int = 0
+    blkio_read_bytes: int = 0
+    blkio_write_bytes: int = 0
+    samples: int = 0
+
+    def __post_init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart the phase clock; run() calls this when the job begins."""
+        self._t0 = self._last = time.monotonic()
+
+    def mark(self, phase: str) -> None:
+        """Attribute the time since the previous mark to phase."""
+        now = time.monotonic()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+        self.wall_sec = now - self._t0
+
+    def observe(self, sample: Dict[str, Any]) -> None:
+        """Fold one Docker stats sample in; counters are cumulative, so keep maxima."""
+        mem = sample.get("memory_stats") or {}
+        cpu = sample.get("cpu_stats") or {}
+        throttling = cpu.get("throttling_data") or {}
+        blkio = (sample.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+        self.samples += 1
+        self.peak_memory_bytes = max(self.peak_memory_bytes, mem.get("max_usage") or 0, mem.get("usage") or 0)
+        self.cpu_time_ns = max(self.cpu_time_ns, (cpu.get("cpu_usage") or {}).get("total_usage") or 0)
+        self.throttled_time_ns = max(self.throttled_time_ns, throttling.get("throttled_time") or 0)
+        self.throttled_periods = max(self.throttled_periods, throttling.get("throttled_periods") or 0)
+        self.peak_pids = max(self.peak_pids, (sample.get("pids_stats") or {}).get("current") or 0)
+        read = sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "read")
+        write = sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "write")
+        self.blkio_read_bytes = max(self.blkio_read_bytes, read)
+        self.blkio_write_bytes = max(self.blkio_write_bytes, write)
+
+    def sample_in_thread(self, container: Any) -> threading.Thread:
+        """Consume container.stats(stream=True) until the container exits."""
+
+        def _sample() -> None:
+            try:
+                for sample in container.stats(stream=True, decode=True):
+                    self.observe(sample)
+            except Exception:
+                pass
+
+        t = threading.Thread(target=_sample, daemon=True)
+        t.start()
+        return t
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def prometheus(self, prefix: str = "codex_job", labels: Optional[Dict[str, str]] = None) -> str:
+        """Prometheus text exposition of these stats."""
+        lbl = ",".join(f'{k}="{v}"' for k, v in sorted((labels or {}).items()))
+
+        def _line(metric: str, value: float, extra: str = "") -> str:
+            inner = ",".join(x for x in (lbl, extra) if x)
+            return f"{prefix}_{metric}{{{inner}}} {value}" if inner else f"{prefix}_{metric} {value}"
+
+        lines = [_line("wall_seconds", self.wall_sec)]
+        lines += [_line("phase_seconds", v, f'phase="{k}"') for k, v in self.phases.items()]
+        lines += [
+            _line("peak_memory_bytes", self.peak_memory_bytes),
+            _line("cpu_seconds", self.cpu_time_ns / 1e9),
+            _line("cpu_throttled_seconds", self.throttled_time_ns / 1e9),
+            _line("cpu_throttled_periods", self.throttled_periods),
+            _line("peak_pids", self.peak_pids),
+            _line("blkio_read_bytes", self.blkio_read_bytes),
+            _line("blkio_write_bytes", self.blkio_write_bytes),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+_clients: Dict[Tuple[int, int], docker.DockerClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(max_pool_size: int = 32) -> docker.DockerClient:
+    """Process-wide docker.from_env() client, created once and reused.
+
+    Sharing the client reuses its HTTP connection pool and API version
+    negotiation across CodexRunner instances. Clients are keyed by pid so a
+    forked child never reuses its parent's sockets.
+    """
+    key = (os.getpid(), max_pool_size)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = docker.from_env(max_pool_size=max_pool_size)
+            _clients[key] = client
+        return client
+
+
+@dataclass
+class CodexJob:
+    """One unit of work for CodexRunner.run_many; fields mirror run()."""
+
+    args: List[str]
+    host_job_dir: Optional[str] = None
+    extra_env: Optional[Dict[str, str]] = None
+    timeout_sec: int = 300
+    entrypoint: Optional[List[str]] = None
+    name: Optional[str] = None
+
+
+def _close_at_exit(ref: "weakref.ref[CodexRunner]") -> None:
+    runner = ref()
+    if runner is not None:
+        runner.close()
 
 
 class CodexRunner:
@@ -20,8 +164,13 @@ class CodexRunner:
         pids_limit: int = 512,
         user: str = "node",
         labels: Optional[Dict[str, str]] = None,
+        pool_size: int = 0,
+        pool_max_jobs: int = 50,
+        pool_idle_timeout_sec: float = 600.0,
+        pool_entrypoint: Optional[List[str]] = None,
+        client: Optional[docker.DockerClient] = None,
     ) -> None:
-        self.client = docker.from_env()
+        self.client = client or get_client()
         self.image = image
         self.workdir = workdir
         self.default_env = default_env or {}
@@ -32,6 +181,24 @@ class CodexRunner:
         self.pids_limit = pids_limit
         self.user = user
         self.labels = labels or {"app": "codex-cli"}
+        # Immutable reference (repo@sha256:... or image id) that run() uses
+        # once resolve_image()/warm_image() has pinned the tag.
+        self.pinned_image: Optional[str] = None
+        self._image_stop = threading.Event()
+        # Pooled containers hold their memory/CPU reservation until killed;
+        # make sure they (and the image refresh) go away with the process.
+        atexit.register(_close_at_exit, weakref.ref(self))
+        # Pooled mode: keep pre-started idle containers and dispatch jobs
+        # into them with exec instead of creating one container per job.
+        self.pool: Optional[ContainerPool] = None
+        if pool_size > 0:
+            self.pool = ContainerPool(
+                self,
+                size=pool_size,
+                max_jobs=pool_max_jobs,
+                idle_timeout_sec=pool_idle_timeout_sec,
+                entrypoint=pool_entrypoint,
+            )
 
     def run(
         self,
@@ -41,6 +208,11 @@ class CodexRunner:
         timeout_sec: int = 300,
         entrypoint: Optional[List[str]] = None,
         name: Optional[str] = None,
+        capture: Optional["LogCapture"] = None,
+        labels: Optional[Dict[str, str]] = None,
+        job_volume: Optional[str] = None,
+        pooled: bool = True,
+        stats: Optional[JobStats] = None,
     ) -> Tuple[int, str]:
         """
         Run a codex job non-interactively. Returns (exit_code, logs).
@@ -48,28 +220,53 @@ class CodexRunner:
         ENTRYPOINT as entrypoint.sh, prefer entrypoint=["bash","-lc"] and a
         full command like ["entrypoint.sh", "run", "--flag", ...] or override
         entrypoint to run codex directly.
+
+        When the runner was created with pool_size > 0 and no explicit name is
+        requested, the job is exec'd inside a warm pooled container instead.
+
+        Output is read incrementally while the job runs. Pass a LogCapture to
+        get live per-line callbacks, separate stdout/stderr tails or a full
+        spill file; `logs` is always the bounded interleaved tail.
+
+        job_volume mounts a named Docker volume at the job dir instead of
+        host_job_dir; pooled=False forces a fresh container.
+
+        Pass a JobStats to collect resource usage and per-phase timings.
         """
         env = {**self.default_env, **(extra_env or {})}
-        volumes = {}
-        if host_job_dir:
-            volumes[os.path.abspath(host_job_dir)] = {
-                "bind": f"{self.workdir}/job",
-                "mode": "rw",
-            }
+        if capture is None:
+            capture = LogCapture()
+        if stats is not None:
+            stats.reset()
+        if self.pool is not None and name is None and pooled and job_volume is None:
+            return self.pool.run(
+                args,
+                host_job_dir=host_job_dir,
+                env=env,
+                timeout_sec=timeout_sec,
+                entrypoint=entrypoint,
+                capture=capture,
+                stats=stats,
+            )
+
+        if job_volume is not None:
+            volumes = {job_volume: {"bind": f"{self.workdir}/job", "mode": "rw"}}
+        else:
+            volumes = self._volumes(host_job_dir)
 
         cmd = args
 
         container = None
-        start = time.time()
         try:
-            container = self.client.containers.run(
-                image=self.image,
+            # create + start (rather than containers.run) so the container is
+            # registered with the shared watcher before it can possibly exit,
+            # and auto-remove is not racing the log read below.
+            container = self._create(
+                image=self.image_ref,
                 command=cmd,
                 entrypoint=entrypoint,  # may be None to use image default
                 working_dir=self.workdir,
                 user=self.user,
-                detach=True,
-                remove=self.remove,
                 network_mode=self.network_mode,
                 volumes=volumes,
                 environment=env,
@@ -80,35 +277,268 @@ class CodexRunner:
                 pids_limit=self.pids_limit,
                 security_opt=["no-new-privileges:true"],
                 read_only=False,
-                labels=self.labels,
+                labels={**self.labels, **(labels or {})},
                 name=name,
             )
+            if stats is not None:
+                stats.mark("create")
+            watcher = ContainerWatcher.for_client(self.client)
+            watcher.register(container.id)
+            stream = self.client.api.attach(
+                container.id, stdout=True, stderr=True, stream=True, logs=True, demux=True
+            )
+            reader = capture.consume_in_thread(stream)
+            container.start()
+            sampler = None
+            if stats is not None:
+                stats.mark("start")
+                sampler = stats.sample_in_thread(container)
 
-            while True:
-                if (time.time() - start) > timeout_sec:
-                    try:
-                        container.kill()
-                    except Exception:
-                        pass
-                    raise TimeoutError(f"codex job timed out after {timeout_sec}s")
-                container.reload()
-                if container.status in ("exited", "dead"):
-                    break
-                time.sleep(0.25)
-
-            logs = container.logs(stdout=True, stderr=True, tail=10000)
-            out = logs.decode("utf-8", errors="replace")
-            code = container.wait().get("StatusCode", 1)
-            return code, out
+            try:
+                code = watcher.wait(container, timeout_sec)
+            except TimeoutError:
+                try:
+                    container.kill()
+                except Exception:
+                    pass
+                raise
+            finally:
+                if stats is not None:
+                    stats.mark("run")
+
+            # The attach stream ends once the container has exited.
+            reader.join(10)
+            if stats is not None:
+                sampler.join(2)
+                stats.mark("logs")
+            return code, capture.text()
         except (APIError, NotFound) as e:
             return 1, f"docker API error: {e}"
         finally:
-            if container is not None and not self.remove:
+            capture.close()
+            if container is not None and self.remove:
+                try:
+                    container.remove(force=True)
+                except Exception:
+                    pass
+            if stats is not None:
+                stats.mark("teardown")
+
+    @property
+    def image_ref(self) -> str:
+        return self.pinned_image or self.image
+
+    def resolve_image(self, pull: Optional[bool] = None) -> str:
+        """Resolve self.image to an immutable reference and pin run() to it.
+
+        pull=None (the default) pulls when the image is missing locally or
+        the local copy came from a registry (it has a RepoDigest for its
+        repo); a locally built tag such as local/codex-cli:latest that is
+        already present is never looked up remotely, so a same-named
+        registry image cannot replace it. If a pull fails the local copy is
+        used. Returns the repo digest when the image has one,
+        else the local image id.
+        """
+        repo, _ = parse_repository_tag(self.image)
+        try:
+            image = self.client.images.get(self.image)
+        except ImageNotFound:
+            image = None
+        if pull is None:
+            pull = image is None or self._repo_digest(image, repo) is not None
+        if pull:
+            try:
+                image = self.client.images.pull(self.image)
+            except APIError:
+                pass
+        if image is None:
+            image = self.client.images.get(self.image)
+        ref = self._repo_digest(image, repo) or image.id
+        self.pinned_image = ref
+        return ref
+
+    @staticmethod
+    def _repo_digest(image: Any, repo: str) -> Optional[str]:
+        digests = image.attrs.get("RepoDigests") or []
+        return next((d for d in digests if d.split("@", 1)[0] == repo), None)
+
+    def warm_image(self, background: bool = True, refresh_sec: Optional[float] = 900.0) -> None:
+        """Pin the image (pulling it if it comes from a registry), then
+        re-resolve the tag every refresh_sec.
+
+        A fresh worker then pays the pull before its first job instead of
+        inside it. Locally built images are re-pinned from the local store
+        only, which picks up rebuilds. Refresh errors keep the previous pin.
+        """
+
+        def _refresh() -> None:
+            while refresh_sec and not self._image_stop.wait(refresh_sec):
                 try:
-                    container.reload()
+                    self.resolve_image()
                 except Exception:
                     pass
 
+        def _warm() -> None:
+            try:
+                self.resolve_image()
+            except Exception:
+                pass
+            _refresh()
+
+        if background:
+            threading.Thread(target=_warm, daemon=True).start()
+            return
+        self.resolve_image()
+        if refresh_sec:
+            threading.Thread(target=_refresh, daemon=True).start()
+
+    def run_snapshot(
+        self,
+        args: List[str],
+        repo_path: str,
+        mode: str = "auto",
+        snapshot_root: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Tuple[int, str, str]:
+        """Run a job against a private snapshot of repo_path.
+
+        Returns (exit_code, logs, diff) where diff holds the job's changes
+        relative to the checkout; the checkout itself is never written, so
+        many snapshot jobs can share one repo. See snapshot.py for modes.
+        """
+        with WorkspaceSnapshot(repo_path, mode=mode, root=snapshot_root, client=self.client) as snap:
+            source, is_volume = snap.mount()
+            if is_volume:
+                code, logs = self.run(args, job_volume=source, **kwargs)
+            else:
+                code, logs = self.run(args, host_job_dir=source, pooled=False, **kwargs)
+            return code, logs, snap.diff()
+
+    def host_capacity(self, host_fraction: float = 0.9) -> int:
+        """How many containers with this runner's limits fit on the Docker host.
+
+        Uses the daemon's NCPU/MemTotal, further capped by MemAvailable when
+        the daemon runs on this machine, and keeps (1 - host_fraction) free.
+        """
+        info = self.client.info()
+        cpus = info.get("NCPU") or os.cpu_count() or 1
+        mem = info.get("MemTotal") or 0
+        if self._daemon_is_local():
+            try:
+                with open("/proc/meminfo", encoding="utf-8") as f:
+                    for line in f:
+                        if line.startswith("MemAvailable:"):
+                            avail = int(line.split()[1]) * 1024
+                            mem = min(mem, avail) if mem else avail
+                            break
+            except OSError:
+                pass
+        slots = int(cpus * 1_000_000_000 * host_fraction) // max(1, self.nano_cpus)
+        mem_limit = parse_bytes(self.mem_limit) if self.mem_limit else 0
+        if mem and mem_limit:
+            slots = min(slots, int(mem * host_fraction) // mem_limit)
+        return max(1, slots)
+
+    def _daemon_is_local(self) -> bool:
+        # docker-py talks to a unix socket through "http+docker://localhost"
+        # ("localunixsocket" in older releases); tcp:// and ssh:// daemons
+        # live elsewhere, so this machine's /proc/meminfo says nothing about them.
+        base_url = getattr(self.client.api, "base_url", "")
+        return base_url in ("http+docker://localhost", "http+docker://localunixsocket")
+
+    def run_many(
+        self,
+        jobs: Iterable[CodexJob],
+        max_parallel: Optional[int] = None,
+        fail_fast: bool = False,
+        host_fraction: float = 0.9,
+    ) -> Iterator[Tuple[CodexJob, int, str]]:
+        """Run jobs concurrently, yielding (job, exit_code, logs) as each completes.
+
+        Parallelism is admitted from host_capacity() and optionally capped by
+        max_parallel. A timed-out job yields exit code 1 with the timeout
+        message. With fail_fast, the first non-zero result cancels queued jobs
+        and kills this batch's running containers (pooled jobs that are
+        already exec'd run to completion).
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        slots = self.host_capacity(host_fraction)
+        if max_parallel:
+            slots = min(slots, max_parallel)
+        batch = {BATCH_LABEL: uuid.uuid4().hex}
+
+        def _one(job: CodexJob) -> Tuple[int, str]:
+            try:
+                return self.run(
+                    job.args,
+                    host_job_dir=job.host_job_dir,
+                    extra_env=job.extra_env,
+                    timeout_sec=job.timeout_sec,
+                    entrypoint=job.entrypoint,
+                    name=job.name,
+                    labels=batch,
+                )
+            except TimeoutError as e:
+                return 1, str(e)
+
+        with ThreadPoolExecutor(max_workers=min(slots, len(jobs))) as pool:
+            pending: Dict[Future, CodexJob] = {pool.submit(_one, j): j for j in jobs}
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        job = pending.pop(fut)
+                        if fut.cancelled():
+                            continue
+                        code, logs = fut.result()
+                        yield job, code, logs
+                        if fail_fast and code != 0:
+                            for other in pending:
+                                other.cancel()
+                            self.kill_labelled(batch)
+            finally:
+                # Generator closed early or fail_fast: do not start queued jobs.
+                for fut in pending:
+                    fut.cancel()
+
+    def kill_labelled(self, labels: Dict[str, str]) -> None:
+        """Kill this runner's containers carrying all of labels (best effort)."""
+        filters = {"label": [f"{k}={v}" for k, v in labels.items()]}
+        try:
+            for c in self.client.containers.list(filters=filters):
+                try:
+                    c.kill()
+                except (APIError, NotFound):
+                    pass
+        except APIError:
+            pass
+
+    def _create(self, **kwargs: Any) -> Any:
+        # containers.create does not pull on its own the way containers.run does
+        try:
+            return self.client.containers.create(**kwargs)
+        except ImageNotFound:
+            self.client.images.pull(kwargs["image"])
+            return self.client.containers.create(**kwargs)
+
+    def close(self) -> None:
+        """Stop image refresh and tear down pooled containers, if any."""
+        self._image_stop.set()
+        if self.pool is not None:
+            self.pool.close()
+
+    def _volumes(self, host_job_dir: Optional[str]) -> Dict[str, Dict[str, str]]:
+        if not host_job_dir:
+            return {}
+        return {
+            os.path.abspath(host_job_dir): {
+                "bind": f"{self.workdir}/job",
+                "mode": "rw",
+            }
+        }
+
     @staticmethod
     def as_json(code: int, logs: str, meta: Optional[Dict[str, str]] = None) -> str:
         payload = {"exit_code": code, "logs": logs}
@@ -117,6 +547,438 @@ class CodexRunner:
         return json.dumps(payload, ensure_ascii=False)
 
 
+class LogCapture:
+    """Bounded, incremental sink for a job's stdout/stderr.
+
+    Keeps the last tail_lines lines per channel (and interleaved) in memory,
+    each tail also capped at tail_bytes characters (about bytes for typical
+    output), so memory stays bounded however long the lines are. It
+    optionally appends the full raw output to spill_path, and calls
+    on_line(channel, line) for every complete line as soon as it arrives.
+    channel is "stdout" or "stderr".
+    """
+
+    # Flush a line without a newline once it grows past this many characters.
+    MAX_LINE = 64 * 1024
+
+    def __init__(
+        self,
+        tail_lines: int = 10000,
+        spill_path: Optional[str] = None,
+        on_line: Optional[Callable[[str, str], None]] = None,
+        tail_bytes: int = 4 * 1024 * 1024,
+    ) -> None:
+        self.stdout: Deque[str] = deque(maxlen=tail_lines)
+        self.stderr: Deque[str] = deque(maxlen=tail_lines)
+        self._combined: Deque[str] = deque(maxlen=tail_lines)
+        self.tail_bytes = tail_bytes
+        self._sizes: Dict[int, int] = {id(self.stdout): 0, id(self.stderr): 0, id(self._combined): 0}
+        self.on_line = on_line
+        self.spill_path = spill_path
+        self.bytes_seen = 0
+        self._partial = {"stdout": "", "stderr": ""}
+        self._decoders = {
+            ch: codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for ch in ("stdout", "stderr")
+        }
+        self._spill = open(spill_path, "ab") if spill_path else None
+        self._closed = False
+
+    def feed(self, channel: str, data: bytes) -> None:
+        if not data:
+            return
+        self.bytes_seen += len(data)
+        if self._spill is not None:
+            self._spill.write(data)
+        text = self._partial[channel] + self._decoders[channel].decode(data)
+        lines = text.split("\n")
+        rest = lines.pop()
+        for line in lines:
+            self._emit(channel, line)
+        if len(rest) > self.MAX_LINE:
+            self._emit(channel, rest)
+            rest = ""
+        self._partial[channel] = rest
+
+    def _push(self, tail: Deque[str], line: str) -> None:
+        key = id(tail)
+        if len(tail) == tail.maxlen:
+            self._sizes[key] -= len(tail[0])  # about to be dropped by maxlen
+        tail.append(line)
+        self._sizes[key] += len(line)
+        while self._sizes[key] > self.tail_bytes and len(tail) > 1:
+            self._sizes[key] -= len(tail.popleft())
+
+    def _emit(self, channel: str, line: str) -> None:
+        self._push(self.stdout if channel == "stdout" else self.stderr, line)
+        self._push(self._combined, line)
+        if self.on_line is not None:
+            try:
+                self.on_line(channel, line)
+            except Exception:
+                pass
+
+    def consume(self, stream: Iterable[Tuple[Optional[bytes], Optional[bytes]]]) -> None:
+        """Drain a demuxed (stdout, stderr) docker stream into this capture."""
+        try:
+            for out, err in stream:
+                if out:
+                    self.feed("stdout", out)
+                if err:
+                    self.feed("stderr", err)
+        except Exception:
+            pass
+
+    def consume_in_thread(self, stream: Iterable[Tuple[Optional[bytes], Optional[bytes]]]) -> threading.Thread:
+        t = threading.Thread(target=self.consume, args=(stream,), daemon=True)
+        t.start()
+        return t
+
+    def close(self) -> None:
+        """Flush partial lines and close the spill file. Idempotent."""
+        if self._closed:
+            return
+        self._closed = True
+        for channel, decoder in self._decoders.items():
+            rest = self._partial[channel] + decoder.decode(b"", final=True)
+            self._partial[channel] = ""
+            if rest:
+                self._emit(channel, rest)
+        if self._spill is not None:
+            self._spill.close()
+
+    def text(self) -> str:
+        """Interleaved tail of both channels."""
+        tail = list(self._combined)
+        tail.extend(p for p in self._partial.values() if p)
+        return "\n".join(tail) + ("\n" if tail else "")
+
+
+class ContainerWatcher:
+    """Single Docker events subscription shared by every in-flight container.
+
+    Waiters block on a per-container threading.Event that the listener thread
+    sets when the container's `die` event arrives, so completion latency does
+    not depend on a poll interval and daemon load does not grow with the
+    number of running jobs. If the events stream drops, waiters fall back to
+    a blocking container.wait() for the remaining time.
+    """
+
+    _instances: Dict[int, "ContainerWatcher"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self._pending: Dict[str, threading.Event] = {}
+        self._codes: Dict[str, Optional[int]] = {}
+        self._stream: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_client(cls, client: Any) -> "ContainerWatcher":
+        with cls._instances_lock:
+            watcher = cls._instances.get(id(client))
+            if watcher is None or watcher.client is not client:
+                watcher = cls(client)
+                cls._instances[id(client)] = watcher
+            return watcher
+
+    def _ensure_listening(self) -> None:
+        with self._lock:
+            if self._stream is not None:
+                return
+            # The request is issued here, synchronously, so the subscription
+            # exists before the caller starts its container.
+            stream = self.client.events(
+                decode=True, filters={"type": "container", "event": "die"}
+            )
+            self._stream = stream
+        threading.Thread(target=self._listen, args=(stream,), daemon=True).start()
+
+    def _listen(self, stream: Any) -> None:
+        try:
+            for ev in stream:
+                actor = ev.get("Actor") or {}
+                cid = ev.get("id") or actor.get("ID")
+                code = (actor.get("Attributes") or {}).get("exitCode")
+                with self._lock:
+                    done = self._pending.get(cid)
+                    if done is None:
+                        continue
+                    self._codes[cid] = int(code) if code is not None else None
+                done.set()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                if self._stream is stream:
+                    self._stream = None
+                waiters = list(self._pending.values())
+            for done in waiters:
+                done.set()
+
+    def register(self, container_id: str) -> None:
+        self._ensure_listening()
+        with self._lock:
+            self._pending[container_id] = threading.Event()
+
+    def wait(self, container: Any, timeout_sec: float) -> int:
+        """Block until the container exits and return its exit code.
+
+        Raises TimeoutError if it is still running after timeout_sec.
+        """
+        deadline = time.time() + timeout_sec
+        with self._lock:
+            done = self._pending.get(container.id)
+        try:
+            if done is not None and done.wait(timeout_sec):
+                with self._lock:
+                    code = self._codes.get(container.id)
+                if code is not None:
+                    return code
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError(f"codex job timed out after {timeout_sec}s")
+            try:
+                return container.wait(timeout=remaining).get("StatusCode", 1)
+            except (ReadTimeout, RequestsConnectionError):
+                raise TimeoutError(f"codex job timed out after {timeout_sec}s")
+        finally:
+            with self._lock:
+                self._pending.pop(container.id, None)
+                self._codes.pop(container.id, None)
+
+
+POOL_LABEL = "codex.pool"
+
+
+@dataclass
+class _PooledContainer:
+    container: Any
+    key: str
+    jobs: int = 0
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+
+class ContainerPool:
+    """Warm containers for CodexRunner, keyed by the mounted host_job_dir.
+
+    Idle containers run a long-lived no-op command and jobs are dispatched
+    into them with exec. A container is recycled after max_jobs executions,
+    after a timeout or an unhealthy check, and evicted by a reaper thread
+    after sitting idle for idle_timeout_sec, whether or not more jobs
+    arrive. Bind mounts are fixed at create time, so each distinct
+    host_job_dir gets its own set of containers. The first job for a
+    host_job_dir starts the remaining size - 1 containers in the background,
+    so concurrent and follow-up jobs for the same dir find them warm.
+    """
+
+    def __init__(
+        self,
+        runner: CodexRunner,
+        size: int = 2,
+        max_jobs: int = 50,
+        idle_timeout_sec: float = 600.0,
+        entrypoint: Optional[List[str]] = None,
+    ) -> None:
+        self.runner = runner
+        self.size = size
+        self.max_jobs = max_jobs
+        self.idle_timeout_sec = idle_timeout_sec
+        # exec bypasses the image ENTRYPOINT, so prepend it explicitly
+        self.entrypoint = entrypoint if entrypoint is not None else ["entrypoint.sh"]
+        self._idle: Dict[str, List[_PooledContainer]] = {}
+        self._busy: Dict[str, _PooledContainer] = {}
+        self._warmed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, daemon=True)
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        interval = min(60.0, max(1.0, self.idle_timeout_sec / 4))
+        while not self._stop.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _key(host_job_dir: Optional[str]) -> str:
+        return os.path.abspath(host_job_dir) if host_job_dir else ""
+
+    def _start(self, key: str) -> _PooledContainer:
+        r = self.runner
+        container = r.client.containers.run(
+            image=r.image_ref,
+            command=["sleep", "infinity"],
+            working_dir=r.workdir,
+            user=r.user,
+            detach=True,
+            remove=True,
+            network_mode=r.network_mode,
+            volumes=r._volumes(key or None),
+            environment=r.default_env,
+            tty=False,
+            stdin_open=False,
+            mem_limit=r.mem_limit,
+            nano_cpus=r.nano_cpus,
+            pids_limit=r.pids_limit,
+            security_opt=["no-new-privileges:true"],
+            read_only=False,
+            labels={**r.labels, POOL_LABEL: "1"},
+        )
+        return _PooledContainer(container=container, key=key)
+
+    @staticmethod
+    def _discard(pc: _PooledContainer) -> None:
+        try:
+            pc.container.kill()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(pc: _PooledContainer) -> bool:
+        try:
+            pc.container.reload()
+        except Exception:
+            return False
+        return pc.container.status == "running"
+
+    def warm(self, host_job_dir: Optional[str] = None, count: Optional[int] = None) -> None:
+        """Pre-start idle containers for host_job_dir up to count (default: the pool size)."""
+        key = self._key(host_job_dir)
+        with self._lock:
+            self._warmed.add(key)
+            missing = (self.size if count is None else count) - len(self._idle.get(key, []))
+        started = [self._start(key) for _ in range(max(0, missing))]
+        with self._lock:
+            if self._stop.is_set():
+                stale, started = started, []
+            else:
+                stale = []
+                self._idle.setdefault(key, []).extend(started)
+        for pc in stale:
+            self._discard(pc)
+
+    def _warm_rest(self, host_job_dir: Optional[str]) -> None:
+        try:
+            self.warm(host_job_dir, count=self.size - 1)
+        except Exception:
+            pass  # jobs fall back to starting containers on demand
+
+    def acquire(self, host_job_dir: Optional[str] = None) -> _PooledContainer:
+        key = self._key(host_job_dir)
+        self.evict_idle()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key, [])
+                pc = idle.pop() if idle else None
+            if pc is None:
+                pc = self._start(key)
+                break
+            if self._healthy(pc):
+                break
+            self._discard(pc)
+        with self._lock:
+            self._busy[pc.container.id] = pc
+            first = key not in self._warmed
+            self._warmed.add(key)
+        # Only now, so this job does not take the spares being started.
+        if first and self.size > 1:
+            threading.Thread(target=self._warm_rest, args=(host_job_dir,), daemon=True).start()
+        return pc
+
+    def release(self, pc: _PooledContainer, healthy: bool = True) -> None:
+        with self._lock:
+            self._busy.pop(pc.container.id, None)
+            pc.jobs += 1
+            pc.last_used = time.time()
+            idle = self._idle.setdefault(pc.key, [])
+            keep = healthy and pc.jobs < self.max_jobs and len(idle) < self.size
+            if keep:
+                idle.append(pc)
+        if not keep:
+            self._discard(pc)
+
+    def evict_idle(self) -> int:
+        """Kill containers idle longer than idle_timeout_sec. Returns count."""
+        cutoff = time.time() - self.idle_timeout_sec
+        stale: List[_PooledContainer] = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                stale.extend(pc for pc in idle if pc.last_used < cutoff)
+                idle[:] = [pc for pc in idle if pc.last_used >= cutoff]
+                if not idle:
+                    self._warmed.discard(key)  # re-warm when the dir is used again
+        for pc in stale:
+            self._discard(pc)
+        return len(stale)
+
+    def run(
+        self,
+        args: List[str],
+        host_job_dir: Optional[str],
+        env: Dict[str, str],
+        timeout_sec: int,
+        entrypoint: Optional[List[str]] = None,
+        capture: Optional["LogCapture"] = None,
+        stats: Optional[JobStats] = None,
+    ) -> Tuple[int, str]:
+        api = self.runner.client.api
+        if capture is None:
+            capture = LogCapture()
+        cmd = list(entrypoint if entrypoint is not None else self.entrypoint) + list(args)
+        try:
+            pc = self.acquire(host_job_dir)
+        except (APIError, NotFound) as e:
+            return 1, f"docker API error: {e}"
+        if stats is not None:
+            stats.mark("acquire")
+
+        healthy = True
+        try:
+            exec_id = api.exec_create(
+                pc.container.id,
+                cmd,
+                stdout=True,
+                stderr=True,
+                environment=env,
+                workdir=self.runner.workdir,
+                user=self.runner.user,
+            )["Id"]
+            stream = api.exec_start(exec_id, stream=True, demux=True)
+            reader = capture.consume_in_thread(stream)
+            reader.join(timeout_sec)
+            if stats is not None:
+                stats.mark("run")
+            if reader.is_alive():
+                # release() kills the container, which also ends the exec stream
+                healthy = False
+                raise TimeoutError(f"codex job timed out after {timeout_sec}s")
+            code = api.exec_inspect(exec_id).get("ExitCode")
+            return (1 if code is None else code), capture.text()
+        except (APIError, NotFound) as e:
+            healthy = False
+            return 1, f"docker API error: {e}"
+        finally:
+            capture.close()
+            self.release(pc, healthy=healthy)
+            if stats is not None:
+                stats.mark("teardown")
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            pcs = [pc for idle in self._idle.values() for pc in idle]
+            pcs.extend(self._busy.values())
+            self._idle.clear()
+            self._busy.clear()
+        for pc in pcs:
+            self._discard(pc)
+
+
 if __name__ == "__main__":
     # Example: run codex with the new non-interactive subcommand
     runner = CodexRunner(default_env={
@@ -134,5 +996,6 @@ if __name__ == "__main__":
         timeout_sec=60,
         name=None,
     )
+    runner.close()
     print(CodexRunner.as_json(code, logs))
 
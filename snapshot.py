@@ -0,0 +1,256 @@
+import difflib
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Per-job isolated views of a repo checkout, so several Codex jobs can edit
+# the same repository concurrently without copying it by hand.
+#
+# Modes:
+#   overlay  a Docker "local" volume of type overlay: the checkout is the
+#            read-only lowerdir and the job writes to a private upperdir.
+#            Needs a Linux daemon on this host; the mount is done by dockerd.
+#   reflink  `cp -a --reflink=always` (btrfs, xfs, APFS-like CoW filesystems).
+#   copy     plain recursive copy.
+#   auto     reflink, falling back to copy.
+#
+# Hardlink trees are deliberately not offered: tools that write files in
+# place would modify the shared checkout through the shared inode.
+
+SNAPSHOT_MODES = ("auto", "overlay", "reflink", "copy")
+SNAPSHOT_LABEL = "codex.snapshot"
+
+
+def _git(repo: str, *args: str, **kwargs: Any) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", "-C", repo, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        **kwargs,
+    )
+
+
+def _read_lines(path: Optional[str]) -> Optional[List[str]]:
+    if path is None:
+        return []
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if b"\0" in data[:8192]:
+        return None  # binary
+    return data.decode("utf-8", errors="replace").splitlines(keepends=True)
+
+
+def file_diff(rel: str, old: Optional[str], new: Optional[str]) -> str:
+    """git-apply compatible unified diff for one file; old/new None means absent."""
+    a, b = _read_lines(old), _read_lines(new)
+    if a is None or b is None:
+        return f"Binary files a/{rel} and b/{rel} differ\n"
+    lines = list(difflib.unified_diff(
+        a, b,
+        fromfile=f"a/{rel}" if old else "/dev/null",
+        tofile=f"b/{rel}" if new else "/dev/null",
+    ))
+    # An empty file that was created or deleted has no hunks, only the header.
+    if not lines and (old is None) == (new is None):
+        return ""
+    out = [f"diff --git a/{rel} b/{rel}\n"]
+    if old is None:
+        out.append("new file mode 100644\n")
+    elif new is None:
+        out.append("deleted file mode 100644\n")
+    for line in lines:
+        out.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+    return "".join(out)
+
+
+def _walk_files(root: str) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        if ".git" in dirnames:
+            dirnames.remove(".git")
+        for fn in filenames:
+            yield os.path.relpath(os.path.join(dirpath, fn), root)
+
+
+def _is_opaque(path: str) -> bool:
+    """Whether overlayfs marked an upperdir directory opaque (trusted.* xattrs
+    need privileges to read; user.* is used with the userxattr option)."""
+    for name in ("trusted.overlay.opaque", "user.overlay.opaque"):
+        try:
+            if os.getxattr(path, name) == b"y":
+                return True
+        except (OSError, AttributeError):
+            pass
+    return False
+
+
+class WorkspaceSnapshot:
+    """Cheap, isolated, diffable copy of repo_path for a single job.
+
+    Use as a context manager; `mount()` gives the volume spec for the job
+    container and `diff()` returns the job's changes as a unified diff
+    relative to the checkout at snapshot time.
+    """
+
+    def __init__(self, repo_path: str, mode: str = "auto", root: Optional[str] = None, client: Any = None) -> None:
+        if mode not in SNAPSHOT_MODES:
+            raise ValueError(f"unknown snapshot mode: {mode}")
+        self.repo_path = os.path.abspath(repo_path)
+        self.mode = mode
+        self.client = client
+        self.root = root
+        self.dir: Optional[str] = None
+        self.path: Optional[str] = None  # host path for copy-style modes
+        self.volume: Any = None  # docker volume for overlay mode
+        self._baseline: Optional[str] = None
+
+    def __enter__(self) -> "WorkspaceSnapshot":
+        self.create()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.cleanup()
+
+    def create(self) -> None:
+        self.dir = tempfile.mkdtemp(prefix="codex-snap-", dir=self.root)
+        if self.mode == "overlay":
+            self._create_overlay()
+            return
+        self.path = os.path.join(self.dir, "tree")
+        if self.mode in ("auto", "reflink"):
+            proc = subprocess.run(
+                ["cp", "-a", "--reflink=always", self.repo_path, self.path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            if proc.returncode == 0:
+                self.mode = "reflink"
+            elif self.mode == "reflink":
+                raise OSError(f"reflink copy failed: {proc.stderr.decode(errors='replace').strip()}")
+            else:
+                shutil.rmtree(self.path, ignore_errors=True)
+                self.mode = "copy"
+        if self.mode == "copy":
+            shutil.copytree(self.repo_path, self.path, symlinks=True)
+        self._record_baseline()
+
+    def _create_overlay(self) -> None:
+        if self.client is None:
+            raise ValueError("overlay snapshots need a docker client")
+        upper = os.path.join(self.dir, "upper")
+        work = os.path.join(self.dir, "work")
+        os.makedirs(upper)
+        os.makedirs(work)
+        self.volume = self.client.volumes.create(
+            name=f"codex-snap-{uuid.uuid4().hex[:12]}",
+            driver="local",
+            driver_opts={
+                "type": "overlay",
+                "device": "overlay",
+                "o": f"lowerdir={self.repo_path},upperdir={upper},workdir={work}",
+            },
+            labels={SNAPSHOT_LABEL: "1"},
+        )
+
+    def _record_baseline(self) -> None:
+        # Stage the whole snapshot once so diff() reports only what the job
+        # changed, not the checkout's own uncommitted edits. checkStat=minimal
+        # lets git trust the copied mtimes instead of rehashing every file.
+        if not os.path.isdir(os.path.join(self.path, ".git")):
+            return
+        try:
+            _git(self.path, "config", "core.checkStat", "minimal")
+            _git(self.path, "add", "-A")
+            self._baseline = _git(self.path, "write-tree").stdout.decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            self._baseline = None
+
+    def mount(self) -> Tuple[str, bool]:
+        """(source, is_volume) to mount at the job's workspace."""
+        if self.volume is not None:
+            return self.volume.name, True
+        return self.path, False
+
+    def diff(self) -> str:
+        if self.volume is not None:
+            return self._overlay_diff()
+        if self._baseline:
+            _git(self.path, "add", "-A")
+            return _git(self.path, "diff", "--cached", "--binary", self._baseline).stdout.decode(
+                "utf-8", errors="replace"
+            )
+        # Not a git checkout: compare both trees file by file.
+        parts = []
+        old_files = set(_walk_files(self.repo_path))
+        new_files = set(_walk_files(self.path))
+        for rel in sorted(old_files | new_files):
+            old = os.path.join(self.repo_path, rel) if rel in old_files else None
+            new = os.path.join(self.path, rel) if rel in new_files else None
+            parts.append(file_diff(rel, old, new))
+        return "".join(parts)
+
+    def _overlay_diff(self) -> str:
+        # The upperdir holds only what the job touched. overlayfs marks a
+        # deleted file or directory with a 0:0 character-device whiteout, and
+        # a directory that replaced a lower one (or was deleted and
+        # recreated) as opaque: nothing below it in the checkout is visible.
+        upper = os.path.join(self.dir, "upper")
+        changed: Dict[str, str] = {}
+        gone: Set[str] = set()  # checkout files hidden by whiteouts/opaque dirs
+
+        def _hide(rel: str) -> None:
+            low = os.path.join(self.repo_path, rel)
+            if os.path.isdir(low) and not os.path.islink(low):
+                gone.update(os.path.join(rel, f) for f in _walk_files(low))
+            elif os.path.lexists(low):
+                gone.add(rel)
+
+        for dirpath, dirnames, filenames in os.walk(upper):
+            if ".git" in dirnames:
+                dirnames.remove(".git")
+            reldir = os.path.relpath(dirpath, upper)
+            reldir = "" if reldir == "." else reldir
+            low_dir = os.path.join(self.repo_path, reldir)
+            if reldir and (_is_opaque(dirpath) or not os.path.isdir(low_dir)):
+                _hide(reldir)
+            for fn in filenames:
+                rel = os.path.join(reldir, fn)
+                up = os.path.join(dirpath, fn)
+                st = os.lstat(up)
+                whiteout = stat.S_ISCHR(st.st_mode) and st.st_rdev == 0
+                low = os.path.join(self.repo_path, rel)
+                if whiteout or (os.path.isdir(low) and not os.path.islink(low)):
+                    _hide(rel)
+                if not whiteout:
+                    changed[rel] = up
+
+        parts = []
+        # Deletions first, so a path that turned from a directory into a
+        # file (or back) applies cleanly.
+        for rel in sorted(gone | set(changed), key=lambda r: (r in changed, r)):
+            low = os.path.join(self.repo_path, rel)
+            low = low if os.path.isfile(low) else None
+            up = changed.get(rel)
+            if low or up:
+                parts.append(file_diff(rel, low, up))
+        return "".join(parts)
+
+    def cleanup(self) -> None:
+        if self.volume is not None:
+            try:
+                self.volume.remove(force=True)
+            except Exception:
+                pass
+            self.volume = None
+        if self.dir:
+            # overlay's workdir is root-owned; whatever we cannot delete is left
+            # for the tmp reaper rather than failing the job.
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None